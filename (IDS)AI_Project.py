@@ -1,3 +1,12 @@
+from functools import partial
+
+from deadlocks import dead_squares
+from heuristics import MatchingHeuristic
+from search_core import cancelled, interrupted, logger, record, record_stop
+from state_engine import as_level
+from transposition import DEFAULT_SIZE, TranspositionTable
+from visited import BloomVisited
+
 LEVEL_MAP = [
     "#######",
     "#@.$.G#",
@@ -6,9 +15,6 @@ LEVEL_MAP = [
     "#######"
 ]
 
-ROWS = len(LEVEL_MAP)
-COLS = len(LEVEL_MAP[0])
-
 ACTIONS = {
     "Up":    (-1, 0),
     "Down":  (1, 0),
@@ -16,125 +22,247 @@ ACTIONS = {
     "Right": (0, 1)
 }
 
-def extract_initial_state():
-    player = None
-    boxes = set()
-
-    for r in range(ROWS):
-        for c in range(COLS):
-            cell = LEVEL_MAP[r][c]
-            if cell == "@":
-                player = (r, c)
-            elif cell == "$":
-                boxes.add((r, c))
-
-    return (player, frozenset(boxes))
-
-def extract_goal_positions():
-    goals = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            if LEVEL_MAP[r][c] == "G":
-                goals.add((r, c))
-    return goals
-
-
-GOALS = extract_goal_positions()
-
-
-def is_wall(cell):
-    r, c = cell                            
-    return LEVEL_MAP[r][c] == "#"
-
-def goal_test(boxes):
-    return boxes == GOALS
-
-def apply_action(state, action):
-    (pr, pc), boxes = state
-    dr, dc = ACTIONS[action]
-
-    next_player = (pr + dr, pc + dc)
-
-    if is_wall(next_player):
-        return None
-
-    if next_player not in boxes:
-        return (next_player, boxes)
-
-    box_target = (next_player[0] + dr, next_player[1] + dc)     
-
-    if is_wall(box_target) or box_target in boxes:              
-        return None
+ACTION_NAMES = list(ACTIONS)
 
-    new_boxes = set(boxes)
-    new_boxes.remove(next_player)
-    new_boxes.add(box_target)
+def limited_dfs(engine, expand, key, key_hash, bound, table, counter, estimate=None,
+                cancel=None, probe=None, best=None):
+    """Depth-first search bounded by f = g + h <= bound.
 
-    return (next_player, frozenset(new_boxes))
+    With estimate=None h is 0 and bound is a plain depth limit (IDS);
+    with a heuristic it is one IDA* iteration.  The recursion is an
+    explicit stack of successor iterators, so solutions of hundreds of
+    moves do not hit Python's recursion limit.  Returns (path, next_bound)
+    where next_bound is the smallest f that exceeded bound, or
+    (None, None) when cancel is set.  counter is [expanded, duplicates,
+    pruned], added to across calls; probe (instrumentation.Probe) gets
+    periodic snapshots of it.  best, [boxes_left, path], is kept at the
+    state with the fewest boxes off the goals seen over all calls.
+    """
 
-def limited_dfs(state, depth, path, visited, counter):
+    if cancel is not None and interrupted(cancel, counter[0]):
+        return None, None
 
     counter[0] += 1
 
-    if goal_test(state[1]):       
-        return path
+    if engine.is_solved(key):       
+        return [], bound
+
+    next_bound = float('inf')
+    # One shared path list, extended and undone as the stack grows and
+    # shrinks instead of copied for every child.
+    path = []
+    stack = [(key, key_hash, 0, expand(key))]
+
+    while stack:
+        key, key_hash, g, children = stack[-1]
+        for move, next_key, pushed_to in children:
+            next_g = g + 1
+            f = next_g
+            if estimate is not None:
+                h = estimate(next_key, key)
+                if h is None:
+                    counter[2] += 1
+                    continue
+                f += h
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+
+            next_hash = engine.zobrist_move(key_hash, key, next_key, pushed_to)
+
+            # Skip a state only if it was already searched with at least
+            # as much budget left; reaching it again by a shorter path
+            # re-opens it.
+            if table.seen(next_hash, bound - next_g):
+                counter[1] += 1
+                continue
+
+            counter[0] += 1
+            if probe is not None and probe.due(counter[0]):
+                probe.snapshot(nodes_expanded=counter[0], duplicates=counter[1],
+                               pruned=counter[2], frontier=len(stack), bound=bound)
+            if cancelled(cancel, counter[0]):
+                return None, None
+            path.append(move)
+            if best is not None and pushed_to >= 0:
+                left = engine.boxes_left(next_key)
+                if left < best[0]:
+                    best[0], best[1] = left, list(path)
+            if engine.is_solved(next_key):
+                return path, bound
+            stack.append((next_key, next_hash, next_g, expand(next_key)))
+            break
+        else:
+            stack.pop()
+            if path:
+                path.pop()
+
+    return None, next_bound
+
+def search_setup(level_map, push_level, prune_dead):
+    engine = as_level(level_map)
+    start_key = engine.start_key
+
+    # With push_level=True the bound counts pushes, not steps.
+    # prune_dead=True skips any push onto a simple dead square.
+    dead = dead_squares(engine) if prune_dead else None
+    if push_level:
+        expand = partial(engine.push_successors, dead=dead)
+        start_key = engine.normalize(start_key)
+    else:
+        expand = partial(engine.successors, dead=dead)
+    return engine, expand, start_key
+
+def make_table(visited, table_size):
+    # 'transposition' is the exact-depth table of transposition.py;
+    # 'bloom' is a fixed-size Bloom filter over (hash, depth left) pairs
+    # that may rarely prune a state it has not seen (visited.py).
+    if visited == 'bloom':
+        return BloomVisited()
+    if visited == 'transposition':
+        return TranspositionTable(table_size)
+    raise ValueError(f"unknown visited store: {visited!r}")
+
+def report_solution(engine, solution, push_level, total_expanded, table, log=print):
+    if push_level:
+        solution = engine.expand_pushes(engine.start_key, solution)
+    solution = [ACTION_NAMES[move] for move in solution]
+    log("Solution found")
+    log(f"Path length: {len(solution)}")
+    log(f"Nodes expanded: {total_expanded}")
+    log(table.stats())
+    return solution
+
+def report_stop(engine, best, push_level, stats, cancel):
+    # The partial result is the best state over all iterations (see
+    # limited_dfs), not the path the stopped iteration was on.
+    if stats is None:
+        return
+    left, path = best
+    if push_level:
+        path = engine.expand_pushes(engine.start_key, path)
+    record(stats, partial=[ACTION_NAMES[move] for move in path], boxes_left=left)
+    record_stop(stats, cancel)
+
+def iterative_deepening_search(level_map=LEVEL_MAP, max_depth=50, push_level=False,
+                               prune_dead=True, table_size=DEFAULT_SIZE, cancel=None,
+                               visited='transposition', quiet=False, stats=None, probe=None):
+
+    engine, expand, start_key = search_setup(level_map, push_level, prune_dead)
+    log = logger(quiet)
+
+    # One bounded transposition table shared by every iteration: a state
+    # that failed with d moves left cannot succeed with fewer next time.
+    table = make_table(visited, table_size)
+    start_hash = engine.zobrist(start_key)
+    # [expanded, duplicates, pruned] over all iterations.
+    counter = [0, 0, 0]
+    best = [engine.boxes_left(start_key), []]
 
-    if depth == 0:                          
-        return None              
-
-    for action in ACTIONS:                                            
-        next_state = apply_action(state, action)
-
-        if next_state and next_state not in visited:                
-            visited.add(next_state)
+    for limit in range(max_depth + 1):
+        log(f"Searching with depth limit = {limit}")
 
-            result = limited_dfs(                                    
-                next_state,
-                depth - 1,
-                path + [action],
-                visited,
-                counter
-            )
+        table.store(start_hash, limit)
 
-            if result is not None:                                 
-                return result
+        solution, next_bound = limited_dfs(
+            engine,
+            expand,
+            start_key,
+            start_hash,
+            limit,
+            table,
+            counter,
+            cancel=cancel,
+            probe=probe,
+            best=best
+        )
 
-    return None                                                 
+        total_expanded = counter[0]
+        record(stats, nodes_expanded=total_expanded, duplicates=counter[1], bound=limit)
 
-def iterative_deepening_search(max_depth=50):
+        if next_bound is None:
+            log("Search cancelled")
+            report_stop(engine, best, push_level, stats, cancel)
+            return None
 
-    start_state = extract_initial_state()
-    total_expanded = 0
+        if solution is not None:
+            return report_solution(engine, solution, push_level, total_expanded, table, log)
 
-    for limit in range(max_depth + 1):
-        print(f"Searching with depth limit = {limit}")
+    log("No solution within depth limit")
+    log(table.stats())
+    return None
 
-        visited = {start_state}                      
-        expanded = [0]
+def ida_star_search(level_map=LEVEL_MAP, max_bound=300, push_level=False, prune_dead=True,
+                    table_size=DEFAULT_SIZE, cancel=None, visited='transposition',
+                    quiet=False, stats=None, probe=None):
+    """IDA*: the IDS driver with f = g + h bounds.
+
+    h is the admissible box/goal matching heuristic (heuristics.py), and
+    each iteration raises the bound to the smallest f that exceeded the
+    previous one, so the first solution found is optimal while memory
+    stays linear in the solution depth (plus the fixed-size table).
+    stats also gets the last bound searched.
+    """
+
+    engine, expand, start_key = search_setup(level_map, push_level, prune_dead)
+    log = logger(quiet)
+    estimate = MatchingHeuristic(engine).estimate
+    if probe is not None:
+        estimate = probe.timed(estimate)
+
+    bound = estimate(start_key)
+    if bound is None:
+        log("No solution: some box can never reach a goal")
+        return None
 
-        solution = limited_dfs(
-            start_state,
-            limit,
-            [],
-            visited,
-            expanded
+    table = make_table(visited, table_size)
+    start_hash = engine.zobrist(start_key)
+    counter = [0, 0, 0]
+    best = [engine.boxes_left(start_key), []]
+
+    while bound <= max_bound:
+        log(f"Searching with f bound = {bound}")
+
+        table.store(start_hash, bound)
+
+        solution, next_bound = limited_dfs(
+            engine,
+            expand,
+            start_key,
+            start_hash,
+            bound,
+            table,
+            counter,
+            estimate,
+            cancel,
+            probe,
+            best
         )
 
-        total_expanded += expanded[0]
+        total_expanded = counter[0]
+        record(stats, nodes_expanded=total_expanded, duplicates=counter[1], pruned=counter[2],
+               bound=bound)
+
+        if next_bound is None:
+            log("Search cancelled")
+            report_stop(engine, best, push_level, stats, cancel)
+            return None
 
         if solution is not None:
-            print("Solution found")
-            print(f"Path length: {len(solution)}")
-            print(f"Nodes expanded: {total_expanded}")
-            return solution
+            return report_solution(engine, solution, push_level, total_expanded, table, log)
+        if next_bound == float('inf'):
+            break
+        bound = next_bound
 
-    print("No solution within depth limit")
+    log("No solution within f bound")
+    log(table.stats())
     return None
 
-print("\n--- IDS Sokoban Solver ---\n")
-solution_path = iterative_deepening_search()
+if __name__ == "__main__":
+    print("\n--- IDS Sokoban Solver ---\n")
+    solution_path = iterative_deepening_search()
 
-if solution_path:
-    print("\nMovement Sequence:")
-    print(" -> ".join(solution_path))
+    if solution_path:
+        print("\nMovement Sequence:")
+        print(" -> ".join(solution_path))
 
@@ -1,4 +1,10 @@
-import heapq
+from functools import partial
+
+from deadlocks import dead_squares, freeze_detector
+from frontiers import make_frontier
+from heuristics import MatchingHeuristic
+from search_core import NodeTable, cancelled, logger, record, record_stop
+from state_engine import as_level
 
 LEVEL_MAP = [
     "#######",
@@ -8,9 +14,6 @@ LEVEL_MAP = [
     "#######"
 ]
 
-ROWS = len(LEVEL_MAP)
-COLS = len(LEVEL_MAP[0])
-
 MOVES = {
     'Up': (-1, 0),
     'Down': (1, 0),
@@ -18,105 +21,117 @@ MOVES = {
     'Right': (0, 1)
 }
 
-def find_goals():
-    goals = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            if LEVEL_MAP[r][c] == 'G':
-                goals.add((r, c))
-    return goals
-
-GOALS = find_goals()
-
-def find_start_state():
-    player = None
-    boxes = set()
-
-    for r in range(ROWS):
-        for c in range(COLS):
-            if LEVEL_MAP[r][c] == '@':
-                player = (r, c)
-            elif LEVEL_MAP[r][c] == '$':
-                boxes.add((r, c))
-
-    return (player, frozenset(boxes))
-
-def is_wall(pos):
-    r, c = pos
-    return LEVEL_MAP[r][c] == '#'
-
-def is_goal(boxes):
-    return boxes == GOALS
-
-def get_next_state(state, action):
-    (pr, pc), boxes = state
-    dr, dc = MOVES[action]
-
-    new_player = (pr + dr, pc + dc)
-
-    if is_wall(new_player):
-        return None
-
-    if new_player not in boxes:
-        return (new_player, boxes)
-
-    box_target = (new_player[0] + dr, new_player[1] + dc)
-
-    if is_wall(box_target) or box_target in boxes:
-        return None
-
-    new_boxes = set(boxes)
-    new_boxes.remove(new_player)
-    new_boxes.add(box_target)
-
-    return (new_player, frozenset(new_boxes))
-
-
-def heuristic(boxes):
+def heuristic(boxes, goals):
     h = 0
     for box in boxes:
-        h += min(abs(box[0] - goal[0]) + abs(box[1] - goal[1]) for goal in GOALS)
+        h += min(abs(box[0] - goal[0]) + abs(box[1] - goal[1]) for goal in goals)
     return h
 
-def solve_sokoban_astar():
-    start_state = find_start_state()
+def solve_sokoban_astar(level_map=LEVEL_MAP, push_level=False, prune_dead=True,
+                        detect_freeze=True, matching=True, frontier='heap', cancel=None,
+                        quiet=False, stats=None, probe=None):
+    engine = as_level(level_map)
+    log = logger(quiet)
+    move_names = list(MOVES)
+    start_key = engine.start_key
+
+    # prune_dead=True skips any push onto a simple dead square and
+    # detect_freeze=True drops states whose last push froze boxes.
+    # A probe also times the heuristic.
+    dead = dead_squares(engine) if prune_dead else None
+    detector = freeze_detector(engine) if detect_freeze else None
+    if push_level:
+        expand = partial(engine.push_successors, dead=dead)
+        start_key = engine.normalize(start_key)
+    else:
+        expand = partial(engine.successors, dead=dead)
+
+    # matching=True uses the box/goal assignment over push distances
+    # (heuristics.py); matching=False keeps the Manhattan heuristic().
+    if matching:
+        estimate = MatchingHeuristic(engine).estimate
+    else:
+        goals = [engine.position(cell) for cell in engine.goal_cells]
+
+        def estimate(key, parent_key=None):
+            return heuristic(engine.box_positions(key), goals)
+
+    if probe is not None:
+        estimate = probe.timed(estimate)
+
+    start_h = estimate(start_key)
+    if start_h is None:
+        log("No solution found")
+        return None
 
-    pq = []
-    heapq.heappush(pq, (heuristic(start_state[1]), 0, start_state, []))
+    # frontier='bucket' swaps the binary heap for a bucket queue indexed
+    # by f (frontiers.py); both break f ties towards higher g.
+    nodes = NodeTable('I' if push_level else 'B')
+    keys = nodes.keys
+    open_list = make_frontier(frontier)
+    open_list.push(start_h, 0, nodes.add(start_key))
 
-    visited_cost = {start_state: 0}
+    visited_cost = {start_key: 0}
     nodes_expanded = 0
-
-    while pq:
-        f, g, current_state, path = heapq.heappop(pq)
+    duplicates = 0
+    pruned = 0
+
+    while open_list:
+        f, g, node = open_list.pop()
+        current_key = keys[node]
+        if g > visited_cost[current_key]:
+            continue
         nodes_expanded += 1
-
-        if is_goal(current_state[1]):
-            print("Solution found using A*")
-            print("Path length:", len(path))
-            print("Nodes expanded:", nodes_expanded)
+        if probe is not None and probe.due(nodes_expanded):
+            probe.snapshot(nodes_expanded=nodes_expanded, generated=len(nodes),
+                           duplicates=duplicates, pruned=pruned, frontier=len(open_list))
+        if cancelled(cancel, nodes_expanded):
+            log("Search cancelled")
+            record_stop(stats, cancel, engine, nodes, move_names, push_level)
+            record(stats, nodes_expanded=nodes_expanded, generated=len(nodes),
+                   duplicates=duplicates, pruned=pruned)
+            return None
+
+        if engine.is_solved(current_key):
+            path = nodes.path(node)
+            if push_level:
+                path = engine.expand_pushes(engine.start_key, path)
+            path = [move_names[move] for move in path]
+            log("Solution found using A*")
+            log("Path length:", len(path))
+            log("Nodes expanded:", nodes_expanded)
+            if detector is not None:
+                log(detector.stats())
+            record(stats, nodes_expanded=nodes_expanded, generated=len(nodes),
+                   duplicates=duplicates, pruned=pruned)
             return path
 
-        for action in MOVES:
-            next_state = get_next_state(current_state, action)
-
-            if next_state:
-                new_g = g + 1
-
-                if next_state not in visited_cost or new_g < visited_cost[next_state]:
-                    visited_cost[next_state] = new_g
-                    new_f = new_g + heuristic(next_state[1])
-                    heapq.heappush(
-                        pq,
-                        (new_f, new_g, next_state, path + [action])
-                    )
-
-    print("No solution found")
+        for move, next_key, pushed_to in expand(current_key):
+            new_g = g + 1
+
+            if next_key not in visited_cost or new_g < visited_cost[next_key]:
+                visited_cost[next_key] = new_g
+                if pushed_to >= 0 and detector is not None and detector.is_deadlocked(next_key, pushed_to):
+                    pruned += 1
+                    continue
+                h = estimate(next_key, current_key)
+                if h is None:
+                    pruned += 1
+                    continue
+                new_f = new_g + h
+                open_list.push(new_f, new_g, nodes.add(next_key, node, move))
+            else:
+                duplicates += 1
+
+    log("No solution found")
+    record(stats, nodes_expanded=nodes_expanded, generated=len(nodes),
+           duplicates=duplicates, pruned=pruned)
     return None
 
-print("\n--- A* Sokoban Solver ---\n")
-solution = solve_sokoban_astar()
+if __name__ == "__main__":
+    print("\n--- A* Sokoban Solver ---\n")
+    solution = solve_sokoban_astar()
 
-if solution:
-    print("\nMovement Sequence:")
-    print(" -> ".join(solution))
+    if solution:
+        print("\nMovement Sequence:")
+        print(" -> ".join(solution))
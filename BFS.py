@@ -1,4 +1,10 @@
 from collections import deque
+from functools import partial
+
+from deadlocks import dead_squares, freeze_detector
+from search_core import NodeTable, cancelled, logger, record, record_stop
+from state_engine import as_level
+from visited import make_visited
 
 LEVEL_MAP = [
     "#######",
@@ -8,9 +14,6 @@ LEVEL_MAP = [
     "#######"
 ]
 
-ROWS = len(LEVEL_MAP)
-COLS = len(LEVEL_MAP[0])
-
 MOVES = {
     'Up': (-1, 0),
     'Down': (1, 0),
@@ -18,116 +21,104 @@ MOVES = {
     'Right': (0, 1)
 }
 
-def find_goals(level_map):
-    """Identifies all fixed goal positions."""
-    goals = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            if level_map[r][c] == 'G':
-                goals.add((r, c))
-    return goals
-
-GOAL_POSITIONS = find_goals(LEVEL_MAP)
-
-def find_start_state(level_map):
-    """Extracts initial Player and Box positions."""
-    player_pos = None
-    box_positions = set()
-    
-    for r in range(ROWS):
-        for c in range(COLS):
-            char = level_map[r][c]
-            if char == '@':
-                player_pos = (r, c)
-            elif char == '$':
-                box_positions.add((r, c))
-    
-    return (player_pos, frozenset(box_positions))
-
-def is_wall(pos):
-    """Checks if a position is a wall."""
-    r, c = pos
-    if 0 <= r < ROWS and 0 <= c < COLS:
-        return LEVEL_MAP[r][c] == '#'
-    return True
-
-def is_goal(box_positions):
-    """Checks if all boxes are on goals."""
-    return box_positions.issubset(GOAL_POSITIONS) and len(box_positions) == len(GOAL_POSITIONS)
-
-
-def get_next_state(current_state, move_dir):
-    """Calculates the resulting state after a valid move."""
-    (pr, pc), box_positions = current_state
-    dr, dc = MOVES[move_dir]
+def solve_sokoban_bfs(level_map, push_level=False, prune_dead=True, detect_freeze=True,
+                      cancel=None, visited='set', quiet=False, stats=None, probe=None):
     
-    new_pr, new_pc = pr + dr, pc + dc
-    
-    if is_wall((new_pr, new_pc)):
-        return None
-    
-    if (new_pr, new_pc) not in box_positions:
-        return ((new_pr, new_pc), box_positions)
-        
+    engine = as_level(level_map)
+    log = logger(quiet)
+    move_names = list(MOVES)
+    start_key = engine.start_key
+
+    # push_level=True branches on box pushes only; the player is
+    # normalized to its reachable region and walks are filled back in
+    # when the solution is found.
+    # prune_dead=True skips any push onto a simple dead square and
+    # detect_freeze=True drops states whose last push froze boxes.
+    # visited picks the store from visited.py: 'set' or the compact
+    # exact 'table'.
+    dead = dead_squares(engine) if prune_dead else None
+    detector = freeze_detector(engine) if detect_freeze else None
+    if push_level:
+        expand = partial(engine.push_successors, dead=dead)
+        start_key = engine.normalize(start_key)
     else:
-        box_pos = (new_pr, new_pc)
-        next_to_box_r, next_to_box_c = new_pr + dr, new_pc + dc
-        next_to_box_pos = (next_to_box_r, next_to_box_c)
-        
-        if is_wall(next_to_box_pos) or next_to_box_pos in box_positions:
-            return None
-        
-        else:
-            new_player_pos = box_pos
-            new_box_positions = set(box_positions)
-            new_box_positions.remove(box_pos)
-            new_box_positions.add(next_to_box_pos)
-            
-            return (new_player_pos, frozenset(new_box_positions))
-
-
-def solve_sokoban_bfs(level_map):
+        expand = partial(engine.successors, dead=dead)
     
-    start_state = find_start_state(level_map)
-    
-    if is_goal(start_state[1]):
-        print("Puzzle already solved!")
+    if engine.is_solved(start_key):
+        log("Puzzle already solved!")
         return []
 
-    queue = deque([(start_state, [])])
+    # States are packed ints (see state_engine.py), so the visited set
+    # holds one small int per state instead of a tuple + frozenset, and
+    # the queue holds node indices into a parent-pointer table.
+    nodes = NodeTable('I' if push_level else 'B')
+    queue = deque([nodes.add(start_key)])
     
-    visited = {start_state}
+    visited = make_visited(visited, engine)
+    visited.add(start_key)
     
     nodes_explored = 0
+    duplicates = 0
+    pruned = 0
 
     while queue:
-        current_state, path = queue.popleft() 
+        node = queue.popleft() 
+        current_key = nodes.keys[node]
         nodes_explored += 1
+        if probe is not None and probe.due(nodes_explored):
+            probe.snapshot(nodes_expanded=nodes_explored, generated=len(nodes),
+                           duplicates=duplicates, pruned=pruned, frontier=len(queue))
+        if cancelled(cancel, nodes_explored):
+            log(" Search cancelled.")
+            record_stop(stats, cancel, engine, nodes, move_names, push_level)
+            record(stats, nodes_expanded=nodes_explored, generated=len(nodes), duplicates=duplicates,
+               pruned=pruned, visited=len(visited),
+               bytes_per_state=visited.bytes_per_state(),
+               false_positive_rate=visited.false_positive_rate())
+            return None
         
-        if is_goal(current_state[1]):
-            print(f" Solution found (Shortest path: {len(path)} moves).")
-            print(f" Nodes Explored: {nodes_explored}")
-            return path
+        if engine.is_solved(current_key):
+            path = nodes.path(node)
+            if push_level:
+                pushes = len(path)
+                path = engine.expand_pushes(engine.start_key, path)
+                log(f" Solution found ({pushes} pushes, {len(path)} moves).")
+            else:
+                log(f" Solution found (Shortest path: {len(path)} moves).")
+            log(f" Nodes Explored: {nodes_explored}")
+            if detector is not None:
+                log(f" {detector.stats()}")
+            log(f" {visited.stats()}")
+            record(stats, nodes_expanded=nodes_explored, generated=len(nodes), duplicates=duplicates,
+               pruned=pruned, visited=len(visited),
+               bytes_per_state=visited.bytes_per_state(),
+               false_positive_rate=visited.false_positive_rate())
+            return [move_names[move] for move in path]
        
-        for move_name, move_delta in MOVES.items():
-            
-            next_state = get_next_state(current_state, move_name)
-            
-            if next_state is not None:
-                if next_state not in visited:
-                    visited.add(next_state)
-                    new_path = path + [move_name]
-                    queue.append((next_state, new_path))
+        for move, next_key, pushed_to in expand(current_key):
+            if visited.add(next_key):
+                if pushed_to >= 0 and detector is not None and detector.is_deadlocked(next_key, pushed_to):
+                    pruned += 1
+                    continue
+                queue.append(nodes.add(next_key, node, move))
+            else:
+                duplicates += 1
                     
-    print(" Puzzle is unsolvable or too deep for current search scope.")
-    print(f"Nodes Explored: {nodes_explored}")
+    log(" Puzzle is unsolvable or too deep for current search scope.")
+    log(f"Nodes Explored: {nodes_explored}")
+    log(f" {visited.stats()}")
+    record(stats, nodes_expanded=nodes_explored, generated=len(nodes), duplicates=duplicates,
+               pruned=pruned, visited=len(visited),
+               bytes_per_state=visited.bytes_per_state(),
+               false_positive_rate=visited.false_positive_rate())
     return None
 
-print("... Starting BFS search ...")
-solution = solve_sokoban_bfs(LEVEL_MAP)
+if __name__ == "__main__":
+    print("... Starting BFS search ...")
+    solution = solve_sokoban_bfs(LEVEL_MAP)
 
-if solution:
-    print("\nSolution Move Sequence:")
+    if solution:
+        print("\nSolution Move Sequence:")
 
-    print(" -> ".join(solution))
+        print(" -> ".join(solution))
 
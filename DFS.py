@@ -1,3 +1,8 @@
+from deadlocks import dead_squares
+from search_core import NodeTable, cancelled, logger, record, record_stop
+from state_engine import as_level
+from visited import make_visited
+
 LEVEL = [
     "#######",
     "#@.$.G#",
@@ -13,32 +18,6 @@ MOVES = {
     'R': (0, 1)
 }
 
-ROWS = len(LEVEL)
-COLS = len(LEVEL[0])
-
-
-def find_initial_state():
-    player = None
-    boxes = set()
-    goals = set()
-
-    for r in range(ROWS):
-        for c in range(COLS):
-            if LEVEL[r][c] == '@':
-                player = (r, c)
-            elif LEVEL[r][c] == '$':
-                boxes.add((r, c))
-            elif LEVEL[r][c] == 'G':
-                goals.add((r, c))
-
-    return player, frozenset(boxes), goals
-
-
-def is_wall(pos):
-    r, c = pos
-    return LEVEL[r][c] == '#'
-
-
 def heuristic(boxes, goals):
     """
     Heuristic = sum of Manhattan distances
@@ -50,85 +29,85 @@ def heuristic(boxes, goals):
     return h
 
 
-def deadlock(box, goals):
-    """
-    Simple deadlock detection:
-    if a box is stuck in a corner and not on a goal
-    """
-    if box in goals:
-        return False
-
-    r, c = box
-    if (is_wall((r-1, c)) and is_wall((r, c-1))) or \
-       (is_wall((r-1, c)) and is_wall((r, c+1))) or \
-       (is_wall((r+1, c)) and is_wall((r, c-1))) or \
-       (is_wall((r+1, c)) and is_wall((r, c+1))):
-        return True
+def solve_sokoban_creative(level_map=LEVEL, max_depth=50, prune_dead=True, cancel=None,
+                           visited='set', quiet=False, stats=None, probe=None):
 
-    return False
+    engine = as_level(level_map)
+    log = logger(quiet)
+    goals = [engine.position(cell) for cell in engine.goal_cells]
+    move_names = list(MOVES)
+    start_key = engine.start_key
 
+    # Dead-square table computed once per level (see deadlocks.py); it
+    # covers every corner the old per-push wall probe caught and more.
+    dead = dead_squares(engine) if prune_dead else None
 
-def solve_sokoban_creative(max_depth=50):
+    # visited picks the store from visited.py; 'bloom' caps memory at
+    # the cost of rarely skipping an unvisited state.
+    visited = make_visited(visited, engine)
+    score = heuristic if probe is None else probe.timed(heuristic)
 
-    player, boxes, goals = find_initial_state()
-    start_state = (player, boxes)
-
-    stack = [(start_state, [], 0)]
-    visited = set()
+    nodes = NodeTable()
+    stack = [(start_key, nodes.add(start_key), 0)]
     nodes_expanded = 0
+    duplicates = 0
 
     while stack:
-        (p, b), path, depth = stack.pop()
+        key, node, depth = stack.pop()
         nodes_expanded += 1
-
-        if b == goals:
-            print("DFS Solution Found!")
-            print("Moves:", " -> ".join(path))
-            print("Path length:", len(path))
-            print("Nodes expanded:", nodes_expanded)
+        if probe is not None and probe.due(nodes_expanded):
+            probe.snapshot(nodes_expanded=nodes_expanded, generated=len(nodes),
+                           duplicates=duplicates, frontier=len(stack), depth=depth)
+        if cancelled(cancel, nodes_expanded):
+            log("Search cancelled")
+            record_stop(stats, cancel, engine, nodes, move_names)
+            record(stats, nodes_expanded=nodes_expanded, generated=len(nodes),
+                   duplicates=duplicates, visited=len(visited),
+                   bytes_per_state=visited.bytes_per_state(),
+                   false_positive_rate=visited.false_positive_rate())
+            return None
+
+        if engine.is_solved(key):
+            path = [move_names[move] for move in nodes.path(node)]
+            log("DFS Solution Found!")
+            log("Moves:", " -> ".join(path))
+            log("Path length:", len(path))
+            log("Nodes expanded:", nodes_expanded)
+            log(visited.stats())
+            record(stats, nodes_expanded=nodes_expanded, generated=len(nodes),
+                   duplicates=duplicates, visited=len(visited),
+                   bytes_per_state=visited.bytes_per_state(),
+                   false_positive_rate=visited.false_positive_rate())
             return path
 
-        if depth >= max_depth or (p, b) in visited:
+        if depth >= max_depth:
+            continue
+        if not visited.add(key):
+            duplicates += 1
             continue
-
-        visited.add((p, b))
 
         successors = []
 
-        for move, (dr, dc) in MOVES.items():
-            new_p = (p[0] + dr, p[1] + dc)
-
-            if is_wall(new_p):
-                continue
-
-            new_boxes = set(b)
-
-            if new_p in b:
-                new_box = (new_p[0] + dr, new_p[1] + dc)
-
-                if is_wall(new_box) or new_box in b:
-                    continue
-
-                if deadlock(new_box, goals):
-                    continue
-
-                new_boxes.remove(new_p)
-                new_boxes.add(new_box)
-
-            successor_state = (new_p, frozenset(new_boxes))
-            score = heuristic(new_boxes, goals)
+        for move, next_key, _ in engine.successors(key, dead):
+            h = score(engine.box_positions(next_key), goals)
 
-            successors.append((score, successor_state, move))
+            successors.append((h, next_key, move))
 
         # heuristic-guided ordering (best first, DFS style)
         successors.sort(key=lambda x: x[0], reverse=True)
 
-        for _, next_state, move in successors:
-            stack.append((next_state, path + [move], depth + 1))
+        for _, next_key, move in successors:
+            stack.append((next_key, nodes.add(next_key, node, move), depth + 1))
 
-    print("No solution found")
-    print("Nodes expanded:", nodes_expanded)
+    log("No solution found")
+    log("Nodes expanded:", nodes_expanded)
+    log(visited.stats())
+    record(stats, nodes_expanded=nodes_expanded, generated=len(nodes), duplicates=duplicates,
+           visited=len(visited),
+           bytes_per_state=visited.bytes_per_state(),
+           false_positive_rate=visited.false_positive_rate())
     return None
 
 
-solve_sokoban_creative()
+if __name__ == "__main__":
+    solve_sokoban_creative()
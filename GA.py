@@ -1,6 +1,18 @@
 import random
-import copy
 import time
+import os
+import queue
+import multiprocessing
+from collections import OrderedDict
+
+from deadlocks import dead_squares
+from search_core import interrupted, logger, record, record_stop
+from state_engine import PackedLevel
+
+try:
+    from ga_vectorized import BatchSimulator
+except ImportError:  # NumPy not installed: fall back to fitness()
+    BatchSimulator = None
 
 LEVEL_MAP = [
     "#######",
@@ -26,26 +38,44 @@ MOVE_NAMES = {
     'R': 'Right'
 }
 
-initial_map = [] # CONVERT MAP
-GOALS = []
-
-for r in range(ROWS):
-    row = []
-    for c in range(COLS):
-        char = LEVEL_MAP[r][c]
-
-        if char == '#':
-            row.append('#')
-        elif char == '@':
-            row.append('P')
-        elif char == '$':
-            row.append('B')
-        elif char == 'G':
-            row.append('G')
-            GOALS.append((r, c))
-        else:
-            row.append(' ')
-    initial_map.append(row)
+def set_level(level_map, prune_dead=False):
+    """Convert level_map into the GA's grid and make it the level that
+    fitness(), the simulators and genetic_algorithm() work on.
+
+    With prune_dead=True a push onto a simple dead square (see
+    deadlocks.py) is treated like a push into a wall, so chromosomes
+    cannot lock a box away."""
+    global LEVEL_MAP, ROWS, COLS, initial_map, GOALS, DEAD_SQUARES, BATCH_SIMULATOR
+    LEVEL_MAP = level_map
+    ROWS = len(level_map)
+    COLS = max(len(row) for row in level_map)
+
+    initial_map = [] # CONVERT MAP
+    GOALS = []
+
+    for r in range(ROWS):
+        row = []
+        for c in range(COLS):
+            char = level_map[r][c] if c < len(level_map[r]) else '#'
+
+            if char == '#':
+                row.append('#')
+            elif char in '@+':
+                row.append('P')
+            elif char in '$*':
+                row.append('B')
+            elif char == 'G':
+                row.append('G')
+            else:
+                row.append(' ')
+            if char in 'G*+':
+                GOALS.append((r, c))
+        initial_map.append(row)
+
+    DEAD_SQUARES = dead_squares(PackedLevel(level_map)) if prune_dead else None
+    BATCH_SIMULATOR = None
+
+set_level(LEVEL_MAP)
 
 def print_grid(grid):
     for row in grid:
@@ -61,56 +91,109 @@ def find_positions(grid, symbol):
 def distance_on_grid(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def apply_move(grid, move):
-    grid = copy.deepcopy(grid)
-    px, py = find_positions(grid, PLAYER)[0]
-    dx, dy = 0, 0
-    
-    if move == 'U': dx = -1
-    if move == 'D': dx = 1
-    if move == 'L': dy = -1
-    if move == 'R': dy = 1
-
-    nx, ny = px + dx, py + dy
+DELTAS = {
+    'U': (-1, 0),
+    'D': (1, 0),
+    'L': (0, -1),
+    'R': (0, 1)
+}
 
-    if grid[nx][ny] == WALL:
+class Simulator:
+    """Mutable game state for replaying chromosomes without grid copies.
+
+    Tracks the player and box coordinates directly: move() is O(1),
+    reports whether anything changed (the same test as new_grid != grid
+    in the old fitness loop) and records an undo entry, so callers can
+    step back with undo() instead of keeping copies.
+    """
+
+    def __init__(self, grid):
+        self.walls = set(find_positions(grid, WALL))
+        self.goals = set(GOALS)
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.player = find_positions(grid, PLAYER)[0]
+        self.boxes = set(find_positions(grid, BOX))
+        self.off_goal = len(self.boxes - self.goals)
+        self.history = []
+
+    def move(self, move):
+        """Apply one move; return True if the player moved."""
+        dx, dy = DELTAS[move]
+        px, py = self.player
+        nxt = (px + dx, py + dy)
+
+        if nxt in self.walls:
+            return False
+
+        pushed = None
+        if nxt in self.boxes:
+            pushed = (nxt[0] + dx, nxt[1] + dy)
+            if pushed in self.walls or pushed in self.boxes:
+                return False
+            if DEAD_SQUARES is not None and DEAD_SQUARES[pushed[0] * COLS + pushed[1]]:
+                return False
+            self._move_box(nxt, pushed)
+
+        self.history.append((self.player, pushed))
+        self.player = nxt
+        return True
+
+    def undo(self):
+        """Revert the last successful move."""
+        player, pushed = self.history.pop()
+        if pushed is not None:
+            self._move_box(pushed, self.player)
+        self.player = player
+
+    def _move_box(self, source, target):
+        self.boxes.remove(source)
+        self.boxes.add(target)
+        self.off_goal += (source in self.goals) - (target in self.goals)
+
+    def is_win(self):
+        return self.off_goal == 0
+
+    def snapshot(self):
+        return self.player, frozenset(self.boxes), self.off_goal
+
+    def restore(self, snapshot):
+        player, boxes, self.off_goal = snapshot
+        self.player = player
+        self.boxes = set(boxes)
+        self.history = []
+
+    def to_grid(self):
+        grid = [[WALL if (r, c) in self.walls else EMPTY for c in range(self.cols)]
+                for r in range(self.rows)]
+        for r, c in self.goals:
+            grid[r][c] = GOAL
+        for r, c in self.boxes:
+            grid[r][c] = BOX
+        grid[self.player[0]][self.player[1]] = PLAYER
         return grid
 
-    if grid[nx][ny] == BOX:
-        bx, by = nx + dx, ny + dy
-        if grid[bx][by] in [WALL, BOX]:
-            return grid
-        grid[bx][by] = BOX
-
-    grid[px][py] = EMPTY
-    grid[nx][ny] = PLAYER
-    return grid
-
-def is_win(grid):
-    boxes = find_positions(grid, BOX)
-    return all(box in GOALS for box in boxes)
-
 def apply_solution(grid, chromosome):
-    grid = copy.deepcopy(grid)
+    sim = Simulator(grid)
     for move in chromosome:
-        grid = apply_move(grid, move)
-    return grid
+        sim.move(move)
+    return sim.to_grid()
 
 # FITNESS FUNCTION
 def fitness(original_grid, chromosome):
-    grid = copy.deepcopy(original_grid)
+    sim = Simulator(original_grid)
     steps_used = 0
 
     for move in chromosome:
-        new_grid = apply_move(grid, move)
-        if new_grid != grid:
+        if sim.move(move):
             steps_used += 1
-        grid = new_grid
         
-        if is_win(grid):
+        if sim.is_win():
             break
 
-    boxes = find_positions(grid, BOX)
+    return score(sim.boxes, steps_used)
+
+def score(boxes, steps_used):
     boxes_on_goals = sum(1 for box in boxes if box in GOALS)
 
     distance_score = 0
@@ -123,80 +206,392 @@ def fitness(original_grid, chromosome):
     )
     return fitness_value
 
-def genetic_algorithm():
-    POP_SIZE = 80
-    MIN_CHROM_LEN = 10
-    MAX_CHROM_LEN = 50
-    GENERATIONS = 300
-
-    population = [
+# Most chromosomes kept by FitnessCache (least recently used go first).
+FITNESS_CACHE_SIZE = 5000
+
+class _PrefixNode:
+    __slots__ = ('children', 'state', 'refs')
+
+    def __init__(self, state):
+        self.children = {}
+        # (simulator snapshot, steps_used, won) after this prefix
+        self.state = state
+        self.refs = 0
+
+class FitnessCache:
+    """fitness() with memoization over chromosome prefixes.
+
+    Every simulated chromosome is threaded into a trie whose nodes hold
+    the game state after that prefix.  Elites are answered from the
+    score table, and a crossover child p1[:cut] + p2[cut:] resumes from
+    the state stored for p1[:cut] instead of replaying it.  At most
+    max_entries chromosomes are kept; evicting one drops the trie nodes
+    no other cached chromosome goes through.
+    """
+
+    def __init__(self, grid, max_entries=FITNESS_CACHE_SIZE):
+        self.sim = Simulator(grid)
+        self.root = _PrefixNode((self.sim.snapshot(), 0, False))
+        self.scores = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.moves_simulated = 0
+        self.moves_saved = 0
+
+    def fitness(self, chromosome):
+        key = ''.join(chromosome)
+        value = self.scores.get(key)
+        if value is not None:
+            self.scores.move_to_end(key)
+            self.hits += 1
+            self.moves_saved += len(key)
+            return value
+        self.misses += 1
+
+        # Deepest cached prefix.
+        node = self.root
+        depth = 0
+        while depth < len(key) and key[depth] in node.children:
+            node = node.children[key[depth]]
+            depth += 1
+        self.moves_saved += depth
+
+        sim = self.sim
+        snapshot, steps_used, won = node.state
+        sim.restore(snapshot)
+        for move in key[depth:]:
+            if not won:
+                if sim.move(move):
+                    steps_used += 1
+                won = sim.is_win()
+                self.moves_simulated += 1
+                snapshot = sim.snapshot()
+            child = _PrefixNode((snapshot, steps_used, won))
+            node.children[move] = child
+            node = child
+
+        value = score(sim.boxes, steps_used)
+        self.scores[key] = value
+        self._retain(key, 1)
+        if len(self.scores) > self.max_entries:
+            old, _ = self.scores.popitem(last=False)
+            self._retain(old, -1)
+        return value
+
+    def _retain(self, key, delta):
+        """Add delta to the reference count of every node on key's path,
+        unlinking nodes that drop to zero."""
+        node = self.root
+        for move in key:
+            child = node.children[move]
+            child.refs += delta
+            if not child.refs:
+                del node.children[move]
+                return
+            node = child
+
+    def stats(self):
+        """Counters since the last call, then reset them."""
+        lookups = self.hits + self.misses
+        result = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'moves_simulated': self.moves_simulated,
+            'moves_saved': self.moves_saved,
+        }
+        self.hits = self.misses = self.moves_simulated = self.moves_saved = 0
+        return result
+
+# Built on first use from initial_map (see population_fitness).
+BATCH_SIMULATOR = None
+
+def population_fitness(population, vectorized=True, cache=None):
+    """Fitness of every chromosome, in population order.
+
+    Goes through cache (a FitnessCache) when one is given, else uses the
+    NumPy batch simulator when available, otherwise calls fitness() once
+    per chromosome.
+    """
+    if cache is not None:
+        return [cache.fitness(c) for c in population]
+    if vectorized and BatchSimulator is not None:
+        global BATCH_SIMULATOR
+        if BATCH_SIMULATOR is None:
+            BATCH_SIMULATOR = BatchSimulator(
+                initial_map, GOALS,
+                find_positions(initial_map, PLAYER)[0],
+                find_positions(initial_map, BOX),
+                DEAD_SQUARES
+            )
+        return BATCH_SIMULATOR.fitness(population).tolist()
+    return [fitness(initial_map, c) for c in population]
+
+POP_SIZE = 80
+MIN_CHROM_LEN = 10
+MAX_CHROM_LEN = 50
+GENERATIONS = 300
+
+# Island model (see island_genetic_algorithm): one population per core,
+# exchanging their best MIGRANTS chromosomes every MIGRATION_INTERVAL
+# generations around a ring.
+ISLANDS = os.cpu_count() or 1
+MIGRATION_INTERVAL = 10
+MIGRANTS = 4
+
+# While waiting for the islands' results, check every ISLAND_POLL
+# seconds whether one of them has died without sending one.
+ISLAND_POLL = 1.0
+
+def random_population():
+    return [
         [random.choice(MOVES) for _ in range(random.randint(MIN_CHROM_LEN, MAX_CHROM_LEN))]
         for _ in range(POP_SIZE)
     ]
 
+def rank(population, vectorized=True, cache=None):
+    """Population sorted best first, with the best fitness."""
+    # Score the whole population once; the sort and the best-so-far
+    # check both reuse these numbers.
+    scores = population_fitness(population, vectorized, cache)
+    order = sorted(range(len(population)), key=scores.__getitem__, reverse=True)
+    return [population[i] for i in order], scores[order[0]]
+
+def solves(chromosome):
+    sim = Simulator(initial_map)
+    for move in chromosome:
+        sim.move(move)
+    return sim.is_win()
+
+def next_generation(population):
+    """Elitism, crossover and mutation over a population sorted best first."""
+    new_population = population[:10]
+
+    # Crossover
+    while len(new_population) < POP_SIZE:
+        p1 = random.choice(population[:20])
+        p2 = random.choice(population[:20])
+
+        cut = random.randint(1, min(len(p1), len(p2)) - 1)
+        child = p1[:cut] + p2[cut:]
+
+    # Mutation
+        if random.random() < 0.15:
+            idx = random.randint(0, len(child) - 1)
+            child[idx] = random.choice(MOVES)
+
+        if random.random() < 0.2:
+            if random.random() < 0.5 and len(child) > MIN_CHROM_LEN:
+                child.pop()
+            elif len(child) < MAX_CHROM_LEN:
+                child.append(random.choice(MOVES))
+
+        new_population.append(child)
+    return new_population
+
+def genetic_algorithm(vectorized=True, cache_size=None, cancel=None, stats=None, probe=None,
+                      quiet=False):
+    """Evolve move sequences for initial_map.
+
+    With cache_size set, scoring goes through a FitnessCache of that
+    many entries and its hit rate is printed every generation.  cancel
+    and probe are looked at once per generation; stats gets the number
+    of generations and of chromosomes scored (as nodes_expanded).
+    """
+    log = logger(quiet)
+    population = random_population()
+
     best_solution = None
     best_fitness = float('-inf')
+    cache = FitnessCache(initial_map, cache_size) if cache_size else None
+    generations = 0
 
-    for _ in range(GENERATIONS):
-        population.sort(
-            key=lambda c: fitness(initial_map, c),
-            reverse=True
-        )
-
-        current_fitness = fitness(initial_map, population[0])
+    for generation in range(GENERATIONS):
+        if cancel is not None and interrupted(cancel, generations * POP_SIZE):
+            record_stop(stats, cancel)
+            break
+        population, current_fitness = rank(population, vectorized, cache)
+        generations += 1
+        if cache is not None:
+            cache_stats = cache.stats()
+            log(f"Generation {generation}: cache hit rate {cache_stats['hit_rate']:.0%}, "
+                  f"moves simulated {cache_stats['moves_simulated']}, "
+                  f"saved {cache_stats['moves_saved']}")
+        if probe is not None and probe.due(generations * POP_SIZE):
+            probe.snapshot(nodes_expanded=generations * POP_SIZE, generations=generations,
+                           fitness=current_fitness, best_fitness=max(best_fitness, current_fitness))
 
         if current_fitness > best_fitness:
             best_fitness = current_fitness
             best_solution = population[0]
 
-        if is_win(apply_solution(initial_map, population[0])):
+        if solves(population[0]):
             break
 
-        new_population = population[:10]
-
-        # Crossover
-        while len(new_population) < POP_SIZE:
-            p1 = random.choice(population[:20])
-            p2 = random.choice(population[:20])
-
-            cut = random.randint(1, min(len(p1), len(p2)) - 1)
-            child = p1[:cut] + p2[cut:]
-
-        # Mutation
-            if random.random() < 0.15:
-                idx = random.randint(0, len(child) - 1)
-                child[idx] = random.choice(MOVES)
-
-            if random.random() < 0.2:
-                if random.random() < 0.5 and len(child) > MIN_CHROM_LEN:
-                    child.pop()
-                elif len(child) < MAX_CHROM_LEN:
-                    child.append(random.choice(MOVES))
-
-            new_population.append(child)
-        population = new_population
+        population = next_generation(population)
+    record(stats, generations=generations, nodes_expanded=generations * POP_SIZE,
+           best_fitness=best_fitness)
     return best_solution, best_fitness
 
-print("... Starting Genetic Algorithm search ...")
+def run_island(index, seed, inbox, outbox, stop, results, vectorized=True):
+    """One island of island_genetic_algorithm(), run in its own process.
+
+    Evolves a private population, sends its best chromosomes to the next
+    island every MIGRATION_INTERVAL generations and puts whatever has
+    arrived in its inbox at the front of its population.  Puts
+    (index, solution, fitness, won, generations) on results when it wins,
+    runs out of generations or sees stop set by another island.
+    """
+    random.seed(seed)
+    # Migrants still queued when the run stops are not needed; do not
+    # block process exit waiting for the next island to read them.
+    outbox.cancel_join_thread()
+    population = random_population()
 
-solution, best_fitness = genetic_algorithm()
-grid = copy.deepcopy(initial_map)
+    best_solution = None
+    best_fitness = float('-inf')
+    won = False
+    generation = 0
 
-print("\nInitial State:")
-print_grid(grid)
+    while generation < GENERATIONS and not stop.is_set():
+        population, current_fitness = rank(population, vectorized)
+        generation += 1
 
-for move in solution:
-    grid = apply_move(grid, move)
-    print(f"Move: {move}")
-    print_grid(grid)
-    time.sleep(0.3)
+        if current_fitness > best_fitness:
+            best_fitness = current_fitness
+            best_solution = population[0]
+
+        if solves(population[0]):
+            best_solution, best_fitness = population[0], current_fitness
+            won = True
+            stop.set()
+            break
 
-    if is_win(grid):
-        print("YOU WIN!\n")
-        break
+        if generation % MIGRATION_INTERVAL == 0:
+            outbox.put(population[:MIGRANTS])
+            arrived = []
+            while not inbox.empty():
+                try:
+                    arrived.extend(inbox.get_nowait())
+                except queue.Empty:
+                    break
+            # Migrants join the elites (they were their island's best),
+            # replacing this island's worst chromosomes.
+            population = arrived + population[:POP_SIZE - len(arrived)]
+
+        population = next_generation(population)
+
+    results.put((index, best_solution, best_fitness, won, generation))
+
+def island_genetic_algorithm(islands=None, vectorized=True, quiet=False):
+    """Run genetic_algorithm() as an island model across processes.
+
+    Each island evolves its own population in a separate process and
+    they stop together as soon as one of them finds a winning
+    chromosome.  Returns the winner (or the fittest chromosome seen when
+    nobody wins) and its fitness, like genetic_algorithm().  An island
+    that dies (killed, out of memory, an exception) is reported and
+    left out; RuntimeError is raised when none of them returns.
+    """
+    islands = islands or ISLANDS
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    inboxes = [multiprocessing.Queue() for _ in range(islands)]
+    workers = [
+        multiprocessing.Process(
+            target=run_island,
+            args=(i, random.getrandbits(32), inboxes[i], inboxes[(i + 1) % islands],
+                  stop, results, vectorized),
+            daemon=True
+        )
+        for i in range(islands)
+    ]
+    for worker in workers:
+        worker.start()
+
+    log = logger(quiet)
+    finished = []
+    failed = set()
+    while len(finished) + len(failed) < islands:
+        try:
+            finished.append(results.get(timeout=ISLAND_POLL))
+            continue
+        except queue.Empty:
+            pass
+        # A finished island has sent its result before exiting, so a
+        # non-zero exit code without one means it failed.
+        reported = {result[0] for result in finished}
+        for i, worker in enumerate(workers):
+            if i not in reported and i not in failed and worker.exitcode not in (None, 0):
+                failed.add(i)
+                log(f"Island {i} died (exit code {worker.exitcode})")
+    for worker in workers:
+        worker.join()
+    if not finished:
+        raise RuntimeError(f"all {islands} islands died")
+
+    finished.sort(key=lambda r: (r[3], r[2]), reverse=True)
+    index, solution, best_fitness, won, generations = finished[0]
+    logger(quiet)(f"Island {index} {'won' if won else 'was fittest'} after {generations} generations "
+          f"({islands} islands)")
+    return solution, best_fitness
+
+def solve_sokoban_ga(level_map, prune_dead=False, cancel=None, quiet=False, stats=None,
+                     probe=None):
+    """Search-solver style entry point: run the GA on level_map and
+    return the winning moves as names ('Up', ...), or None when no
+    chromosome solved the level.  level_map may also be a PackedLevel;
+    prune_dead is passed to set_level().  Without a win, the fittest
+    chromosome's moves go to stats['partial']."""
+    if isinstance(level_map, PackedLevel):
+        level_map = level_map.level_map
+    set_level(level_map, prune_dead)
+    solution, _ = genetic_algorithm(cancel=cancel, stats=stats, probe=probe, quiet=quiet)
+    if solution is None:
+        logger(quiet)("GA found no winning chromosome")
+        return None
+
+    # Drop the moves that bump into walls or blocked boxes and anything
+    # after the level is solved, so the result replays in every solver.
+    sim = Simulator(initial_map)
+    path = []
+    for move in solution:
+        if sim.move(move):
+            path.append(MOVE_NAMES[move])
+            if sim.is_win():
+                break
+    if sim.is_win():
+        return path
+
+    logger(quiet)("GA found no winning chromosome")
+    record(stats, partial=path, boxes_left=sim.off_goal)
+    return None
+
+if __name__ == "__main__":
+    print("... Starting Genetic Algorithm search ...")
+
+    if ISLANDS > 1:
+        solution, best_fitness = island_genetic_algorithm()
+    else:
+        solution, best_fitness = genetic_algorithm()
+    sim = Simulator(initial_map)
+
+    print("\nInitial State:")
+    print_grid(sim.to_grid())
+
+    for move in solution:
+        sim.move(move)
+        print(f"Move: {move}")
+        print_grid(sim.to_grid())
+        time.sleep(0.3)
+
+        if sim.is_win():
+            print("YOU WIN!\n")
+            break
 
-print("Solution found.")
-print(f"Moves Count: {len(solution)}")
-print(f"Best Fitness: {best_fitness}")
-print("\nSolution Move Sequence:")
-print(" -> ".join(MOVE_NAMES[m] for m in solution))
+    print("Solution found.")
+    print(f"Moves Count: {len(solution)}")
+    print(f"Best Fitness: {best_fitness}")
+    print("\nSolution Move Sequence:")
+    print(" -> ".join(MOVE_NAMES[m] for m in solution))
@@ -1,3 +1,7 @@
+from deadlocks import dead_squares
+from search_core import interrupted, logger, record, record_stop
+from state_engine import as_level
+
 LEVEL_MAP = [
     "#######",
     "#@.$ G#",
@@ -6,9 +10,6 @@ LEVEL_MAP = [
     "#######"
 ]
 
-ROWS = len(LEVEL_MAP)
-COLS = len(LEVEL_MAP[0])
-
 MOVES = {
     'Up': (-1, 0),
     'Down': (1, 0),
@@ -16,95 +17,67 @@ MOVES = {
     'Right': (0, 1)
 }
 
-def find_goals(level_map):
-    goals = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            if level_map[r][c] == 'G':
-                goals.add((r, c))
-    return goals
-
-GOAL_POSITIONS = find_goals(LEVEL_MAP)
-
-def find_start_state(level_map):
-    player_pos = None
-    box_positions = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            char = level_map[r][c]
-            if char == '@':
-                player_pos = (r, c)
-            elif char == '$':
-                box_positions.add((r, c))
-    return (player_pos, frozenset(box_positions))
-
-def is_wall(pos):
-    r, c = pos
-    if 0 <= r < ROWS and 0 <= c < COLS:
-        return LEVEL_MAP[r][c] == '#'
-    return True
-
-def is_goal(box_positions):
-    return box_positions.issubset(GOAL_POSITIONS) and len(box_positions) == len(GOAL_POSITIONS)
-
-def get_next_state(current_state, move_dir):
-    (pr, pc), box_positions = current_state
-    dr, dc = MOVES[move_dir]
-    new_pr, new_pc = pr + dr, pc + dc
-    if is_wall((new_pr, new_pc)):
-        return None
-    if (new_pr, new_pc) not in box_positions:
-        return ((new_pr, new_pc), box_positions)
-    else:
-        box_pos = (new_pr, new_pc)
-        next_to_box_pos = (new_pr + dr, new_pc + dc)
-        if is_wall(next_to_box_pos) or next_to_box_pos in box_positions:
-            return None
-        new_box_positions = set(box_positions)
-        new_box_positions.remove(box_pos)
-        new_box_positions.add(next_to_box_pos)
-        return (box_pos, frozenset(new_box_positions))
-
-def heuristic(box_positions):
+def heuristic(box_positions, goals):
     total_dist = 0
     for box in box_positions:
-        min_dist = min(abs(box[0]-goal[0]) + abs(box[1]-goal[1]) for goal in GOAL_POSITIONS)
+        min_dist = min(abs(box[0]-goal[0]) + abs(box[1]-goal[1]) for goal in goals)
         total_dist += min_dist
     return total_dist
 
-def solve_sokoban_hill_climbing(level_map, max_steps=1000):
-    start_state = find_start_state(level_map)
-    if is_goal(start_state[1]):
-        print("Puzzle already solved")
+def solve_sokoban_hill_climbing(level_map, max_steps=1000, prune_dead=True, cancel=None,
+                                quiet=False, stats=None, probe=None):
+    engine = as_level(level_map)
+    log = logger(quiet)
+    move_names = list(MOVES)
+    # prune_dead=True never lets the climber push a box onto a dead square.
+    dead = dead_squares(engine) if prune_dead else None
+    goals = [engine.position(cell) for cell in engine.goal_cells]
+    # A climb that does not reach the goal leaves its path so far in
+    # stats['partial']; cancel is checked every step.
+    score = heuristic if probe is None else probe.timed(heuristic)
+    current_key = engine.start_key
+    if engine.is_solved(current_key):
+        log("Puzzle already solved")
         return []
 
-    current_state = start_state
     path = []
     nodes_explored = 0
+    generated = 0
 
     for step in range(max_steps):
         nodes_explored += 1
+        if probe is not None and probe.due(nodes_explored):
+            probe.snapshot(nodes_expanded=nodes_explored, generated=generated,
+                           h=score(engine.box_positions(current_key), goals))
+        if cancel is not None and interrupted(cancel, nodes_explored):
+            log("Search cancelled")
+            record(stats, nodes_expanded=nodes_explored, generated=generated,
+                   partial=path, boxes_left=engine.boxes_left(current_key))
+            record_stop(stats, cancel)
+            return None
         successors = []
-        for move_name in MOVES:
-            next_state = get_next_state(current_state, move_name)
-            if next_state is not None:
-                h = heuristic(next_state[1])
-                successors.append((h, move_name, next_state))
+        for move, next_key, _ in engine.successors(current_key, dead):
+            h = score(engine.box_positions(next_key), goals)
+            successors.append((h, move, next_key))
         if not successors:
             break
+        generated += len(successors)
         successors.sort(key=lambda x: x[0])
-        best_h, best_move, best_state = successors[0]
-        if best_h >= heuristic(current_state[1]):
+        best_h, best_move, best_key = successors[0]
+        if best_h >= score(engine.box_positions(current_key), goals):
             break
-        current_state = best_state
-        path.append(best_move)
-        if is_goal(current_state[1]):
-            print(f"Solution found in {len(path)} moves")
-            print(f"Nodes explored: {nodes_explored}")
+        current_key = best_key
+        path.append(move_names[best_move])
+        if engine.is_solved(current_key):
+            log(f"Solution found in {len(path)} moves")
+            log(f"Nodes explored: {nodes_explored}")
+            record(stats, nodes_expanded=nodes_explored, generated=generated)
             return path
 
-    print("Hill Climbing failed (stuck or dead-end)")
-    print(f"Nodes explored: {nodes_explored}")
+    log("Hill Climbing failed (stuck or dead-end)")
+    log(f"Nodes explored: {nodes_explored}")
+    record(stats, nodes_expanded=nodes_explored, generated=generated,
+           partial=path, boxes_left=engine.boxes_left(current_key))
     return None
 
 if __name__ == "__main__":
@@ -1,4 +1,9 @@
-from queue import PriorityQueue
+from functools import partial
+
+from deadlocks import dead_squares
+from frontiers import make_frontier
+from search_core import NodeTable, cancelled, logger, record, record_stop
+from state_engine import as_level
 
 LEVEL_MAP = [
     "#######",
@@ -8,9 +13,6 @@ LEVEL_MAP = [
     "#######"
 ]
 
-ROWS = len(LEVEL_MAP)    
-COLS = len(LEVEL_MAP[0]) 
-
 MOVES = {
     'Up': (-1, 0),
     'Down': (1, 0),
@@ -18,100 +20,112 @@ MOVES = {
     'Right': (0, 1)
 }
 
-def find_goals(level_map):
-    goals = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            if level_map[r][c] == 'G': 
-                goals.add((r, c))
-    return goals
-
-GOAL_POSITIONS = find_goals(LEVEL_MAP)  
-
-def find_start_state(level_map):
-    player_pos = None
-    box_positions = set()
-    for r in range(ROWS):
-        for c in range(COLS):
-            char = level_map[r][c]
-            if char == '@':
-                player_pos = (r, c)  
-            elif char == '$':
-                box_positions.add((r, c)) 
-    return (player_pos, frozenset(box_positions))
-
-def is_wall(pos):
-    r, c = pos
-    if 0 <= r < ROWS and 0 <= c < COLS:
-        return LEVEL_MAP[r][c] == '#'
-    return True  
-
-def is_goal(box_positions):
-    return box_positions.issubset(GOAL_POSITIONS) and len(box_positions) == len(GOAL_POSITIONS)
-
-def get_next_state(current_state, move_dir):
-    (pr, pc), box_positions = current_state
-    dr, dc = MOVES[move_dir]
-    new_pr, new_pc = pr + dr, pc + dc
-
-    if is_wall((new_pr, new_pc)):
-        return None
-    if (new_pr, new_pc) not in box_positions:
-        return ((new_pr, new_pc), box_positions)
-    
-    box_pos = (new_pr, new_pc)
-    next_to_box_pos = (new_pr + dr, new_pc + dc)
-    if is_wall(next_to_box_pos) or next_to_box_pos in box_positions:
-        return None
-
-    new_box_positions = set(box_positions)
-    new_box_positions.remove(box_pos)
-    new_box_positions.add(next_to_box_pos)
-    return (box_pos, frozenset(new_box_positions))
-
-def solve_sokoban_ucs(level_map):
-    start_state = find_start_state(level_map)
-
-    if is_goal(start_state[1]):
-        print("Puzzle already solved!")
+def solve_sokoban_ucs(level_map, push_level=False, prune_dead=True,
+                      push_cost=1, verbose=False, progress_every=10000,
+                      frontier='heap', cancel=None, quiet=False, stats=None, probe=None):
+    """Uniform-cost search.
+
+    Every walk costs 1 and every push costs push_cost, so push_cost > 1
+    prefers solutions that move boxes less (see "Path Cost" in README.md).
+    With push_level=True each edge is one push and costs push_cost.
+
+    frontier selects the open list from frontiers.py: 'heap' (heapq with
+    an insertion-counter tie-breaker, so keys are never compared) or
+    'bucket' (one bucket per integer cost, so push_cost must be a whole
+    number).  Stale entries are skipped when popped (lazy deletion).
+    verbose=True prints every visited node; otherwise a progress line is
+    printed every progress_every expansions.
+    """
+    engine = as_level(level_map)
+    log = logger(quiet)
+    move_names = list(MOVES)
+    start_key = engine.start_key
+
+    # prune_dead=True skips any push onto a simple dead square.
+    dead = dead_squares(engine) if prune_dead else None
+    if push_level:
+        expand = partial(engine.push_successors, dead=dead)
+        start_key = engine.normalize(start_key)
+    else:
+        expand = partial(engine.successors, dead=dead)
+
+    def describe(path):
+        if push_level:
+            path = engine.expand_pushes(engine.start_key, path)
+        return ' -> '.join(move_names[move] for move in path)
+
+    if engine.is_solved(start_key):
+        log("Puzzle already solved!")
         return []
 
-    pq = PriorityQueue() 
-    pq.put((0, start_state, []))  
-    visited = dict()     
+    nodes = NodeTable('I' if push_level else 'B')
+    keys = nodes.keys
+    if frontier == 'bucket':
+        if push_cost != int(push_cost):
+            raise ValueError(f"the bucket frontier needs an integer push_cost, got {push_cost!r}")
+        push_cost = int(push_cost)
+    open_list = make_frontier(frontier)
+    open_list.push(0, 0, nodes.add(start_key))
+    best_cost = {start_key: 0}
     nodes_explored = 0
-
-    while not pq.empty():
-        cost, current_state, path = pq.get()
+    duplicates = 0
+    stale = 0
+
+    while open_list:
+        cost, _, node = open_list.pop()
+        current_key = keys[node]
+        if cost > best_cost[current_key]:
+            stale += 1
+            continue
         nodes_explored += 1
-
-        if is_goal(current_state[1]):
-            print(f"\nSolution found (Shortest path: {len(path)} moves)")
-            print(f"Nodes Explored: {nodes_explored}")
-            print("\nSolution Move Sequence:")
-            print(" -> ".join(path))
+        if probe is not None and probe.due(nodes_explored):
+            probe.snapshot(nodes_expanded=nodes_explored, generated=len(nodes),
+                           duplicates=duplicates, frontier=len(open_list), stale_pops=stale)
+        if cancelled(cancel, nodes_explored):
+            log("Search cancelled.")
+            record_stop(stats, cancel, engine, nodes, move_names, push_level)
+            record(stats, nodes_expanded=nodes_explored, generated=len(nodes),
+                   duplicates=duplicates, stale_pops=stale)
+            return None
+
+        if verbose:
+            log(f"Visiting node. Cost: {cost}, Path: {describe(nodes.path(node))}")
+        elif nodes_explored % progress_every == 0:
+            log(f"  explored {nodes_explored}, frontier {len(open_list)}, "
+                f"cost {cost}, stale pops {stale}")
+
+        if engine.is_solved(current_key):
+            path = nodes.path(node)
+            if push_level:
+                pushes = len(path)
+                path = engine.expand_pushes(engine.start_key, path)
+            path = [move_names[move] for move in path]
+            if push_level:
+                log(f"\nSolution found ({pushes} pushes, {len(path)} moves, cost {cost})")
+            else:
+                log(f"\nSolution found (Shortest path: {len(path)} moves, cost {cost})")
+            log(f"Nodes Explored: {nodes_explored}")
+            log("\nSolution Move Sequence:")
+            log(" -> ".join(path))
+            record(stats, nodes_expanded=nodes_explored, generated=len(nodes),
+                   duplicates=duplicates, stale_pops=stale, cost=cost)
             return path
 
-        if current_state in visited:
-            if cost < visited[current_state]:
-                print(f"Node revisited with lower cost! Cost: {cost}, Path: {' -> '.join(path)}")
+        for move, next_key, pushed_to in expand(current_key):
+            if push_level or pushed_to >= 0:
+                next_cost = cost + push_cost
             else:
-                print(f"Node skipped (already visited with equal/less cost). Cost: {cost}, Path: {' -> '.join(path)}")
-                continue
-        else:
-            print(f"Visiting new node. Cost: {cost}, Path: {' -> '.join(path)}")
-
-        visited[current_state] = cost
-
-        for move_name in MOVES:
-            next_state = get_next_state(current_state, move_name)
-            if next_state is not None:
                 next_cost = cost + 1
-                if next_state not in visited or visited[next_state] > next_cost:
-                    pq.put((next_cost, next_state, path + [move_name]))
+            if next_cost < best_cost.get(next_key, next_cost + 1):
+                best_cost[next_key] = next_cost
+                open_list.push(next_cost, next_cost, nodes.add(next_key, node, move))
+            else:
+                duplicates += 1
 
-    print("Puzzle is unsolvable or too deep.")
-    print(f"Nodes Explored: {nodes_explored}")
+    log("Puzzle is unsolvable or too deep.")
+    log(f"Nodes Explored: {nodes_explored}")
+    record(stats, nodes_expanded=nodes_explored, generated=len(nodes), duplicates=duplicates,
+           stale_pops=stale)
     return None
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+"""Solve every level of an XSB collection and write one JSON line each.
+
+    python batch.py collection.xsb --solver astar-push --timeout 60 \
+        --output results.jsonl
+
+--solver is any name from portfolio.SOLVERS.  Levels are streamed from
+the file (levels.iter_levels) and solved one after the other in this
+process with sokoban.solve(); --timeout is its time limit.  Each output line
+records the level, the outcome ("solved", "unsolved", "timeout",
+"invalid" or "error"), the solution in LURD notation (lower case for
+walks, upper case for pushes), its move and push counts and the time
+taken.  Lines are flushed as they are written, so a run that is killed
+keeps the results so far.
+
+--cache names a solution_cache.py database: levels solved before (in any
+rotation or reflection) are answered from it, marked "cached": true,
+and new solutions are saved to it.
+"""
+import argparse
+import json
+import sys
+import time
+
+from levels import iter_levels
+from portfolio import SOLVERS, lurd
+from sokoban import Limits, make_level, solve
+from solution_cache import SolutionCache
+
+
+def solve_level(solver, level_map, timeout=None, cache=None):
+    """Run one SOLVERS configuration on level_map through sokoban.solve();
+    returns the result fields of its JSON line.  cache, a SolutionCache,
+    is used as there."""
+    try:
+        level = make_level(level_map)
+    except ValueError as error:
+        return {'status': 'error', 'error': str(error)}
+
+    start = time.perf_counter()
+    try:
+        result = solve(level, Limits(time=timeout), solver, cache=cache)
+    except Exception as error:
+        return {'status': 'error', 'error': repr(error),
+                'seconds': round(time.perf_counter() - start, 3)}
+    seconds = round(result.seconds, 3)
+
+    if not result.solved:
+        return {'status': result.status, 'seconds': seconds}
+    # Also catches a cached solution that no longer replays.
+    solution = lurd(level_map, result.moves)
+    if solution is None:
+        return {'status': 'invalid', 'seconds': seconds}
+    record = {'status': 'solved', 'moves': len(solution),
+              'pushes': sum(letter.isupper() for letter in solution),
+              'solution': solution, 'seconds': seconds}
+    if result.stats.get('cached'):
+        record['cached'] = True
+    return record
+
+
+def solve_collection(path, solver='astar-push', timeout=None, output=sys.stdout, cache=None):
+    """Solve every level in path, writing JSON lines to output; returns
+    a {status: count} summary."""
+    summary = {}
+    for index, (name, level_map) in enumerate(iter_levels(path), 1):
+        record = {'index': index, 'level': name, 'solver': solver}
+        record.update(solve_level(solver, level_map, timeout, cache))
+        output.write(json.dumps(record) + '\n')
+        output.flush()
+        summary[record['status']] = summary.get(record['status'], 0) + 1
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('collection', help='.xsb/.sok file with one or more levels')
+    parser.add_argument('--solver', default='astar-push', choices=sorted(SOLVERS))
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds per level (default: no limit)')
+    parser.add_argument('--output', default=None,
+                        help='JSON lines file (default: standard output)')
+    parser.add_argument('--cache', default=None,
+                        help='SQLite solution cache to read and update')
+    args = parser.parse_args(argv)
+
+    cache = SolutionCache(args.cache) if args.cache else None
+    try:
+        if args.output:
+            with open(args.output, 'w') as output:
+                summary = solve_collection(args.collection, args.solver, args.timeout,
+                                           output, cache)
+        else:
+            summary = solve_collection(args.collection, args.solver, args.timeout,
+                                       cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    print(', '.join(f"{status}: {count}" for status, count in sorted(summary.items())),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
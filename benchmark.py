@@ -0,0 +1,343 @@
+"""Benchmark the solvers on a fixed corpus of levels.
+
+    python benchmark.py --repeats 3 --timeout 30 --json bench.json
+    python benchmark.py --json new.json --compare bench.json
+
+Every (algorithm, level) pair runs in a fresh process: warmup runs
+first, whose results are thrown away, then repeats timed runs through
+sokoban.solve().  For each pair the table and the JSON report the
+median and fastest wall time, the nodes expanded (the solver's
+stats['nodes_expanded']), nodes per second, the solution length and the
+peak RSS of the worker process, which includes the interpreter itself
+(about 10-20 MB) and is not available on Windows.
+
+The corpus is the bundled levels below plus levels generated by
+generate_level() from fixed seeds, so two runs of the same version
+measure the same work; --collection adds the levels of an XSB file.
+With --compare the new results are checked against an earlier JSON
+report and pairs that got slower by more than --tolerance or changed
+their node count or solution length are listed.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import queue
+import random
+import statistics
+import time
+
+import sokoban
+from bidirectional import goal_states, pull_successors
+from budget import peak_rss
+from levels import iter_levels
+from state_engine import PackedLevel
+
+# The algorithms of README.md, as named in portfolio.SOLVERS.
+DEFAULT_ALGORITHMS = ('bfs', 'ucs', 'astar', 'dfs', 'ids', 'hill-climbing', 'ga')
+
+BUNDLED_LEVELS = {
+    # The level every solver script runs on.
+    'project': [
+        "#######",
+        "#@.$ G#",
+        "#.#.#.#",
+        "#.$ G #",
+        "#######"
+    ],
+    'two-rooms': [
+        "########",
+        "#   #  #",
+        "# $  $ #",
+        "#G# ## #",
+        "# @   G#",
+        "########"
+    ],
+    'open-room': [
+        "#########",
+        "#       #",
+        "# $ $ $ #",
+        "#   @   #",
+        "#G  G  G#",
+        "#########"
+    ],
+    'corridors': [
+        "####  ",
+        "# G#  ",
+        "#  ###",
+        "#$@  #",
+        "#G $ #",
+        "#  ###",
+        "####  "
+    ],
+}
+
+# (width, height, boxes, seed) of the generated levels.
+GENERATED_LEVELS = (
+    (7, 7, 2, 1),
+    (8, 7, 2, 2),
+    (8, 8, 3, 3),
+    (9, 8, 3, 4),
+)
+
+# The random module is reseeded before every run, so the randomized
+# solvers (GA) repeat the same work from version to version.
+RUN_SEED = 0
+
+# Timings shorter than this are mostly noise and are not compared.
+MIN_COMPARE_SECONDS = 0.01
+
+DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def generate_level(width, height, boxes, seed, wall_density=0.15):
+    """A solvable level made by reverse play.
+
+    Interior walls are scattered at random and only the floor connected
+    to one cell is kept.  Goals are picked at random and, starting from
+    every solved state, a breadth-first search over pulls (the reverse
+    of pushes, see bidirectional.py) finds the state that needs the most
+    pushes; that state becomes the level's start.
+    """
+    rng = random.Random(seed)
+    while True:
+        cells = [(r, c) for r in range(1, height - 1) for c in range(1, width - 1)]
+        open_cells = {cell for cell in cells if rng.random() >= wall_density}
+        if not open_cells:
+            continue
+
+        start = rng.choice(sorted(open_cells))
+        floor = {start}
+        stack = [start]
+        while stack:
+            r, c = stack.pop()
+            for dr, dc in DELTAS:
+                cell = (r + dr, c + dc)
+                if cell in open_cells and cell not in floor:
+                    floor.add(cell)
+                    stack.append(cell)
+        if len(floor) < boxes * 3 + 2:
+            continue
+
+        goals = set(rng.sample(sorted(floor), boxes))
+        player = rng.choice(sorted(floor - goals))
+        solved_map = [''.join('#' if (r, c) not in floor
+                              else '@' if (r, c) == player
+                              else '*' if (r, c) in goals else ' '
+                              for c in range(width))
+                      for r in range(height)]
+        engine = PackedLevel(solved_map)
+
+        depth = {key: 0 for key in goal_states(engine)}
+        layer = list(depth)
+        deepest = layer[0]
+        while layer:
+            next_layer = []
+            for key in layer:
+                for _, previous in pull_successors(engine, key):
+                    if previous not in depth:
+                        depth[previous] = depth[key] + 1
+                        next_layer.append(previous)
+            if next_layer:
+                deepest = next_layer[0]
+            layer = next_layer
+        if depth[deepest] == 0:
+            continue
+
+        player_cell = engine.player_of(deepest)
+        box_cells = set(engine.box_cells(deepest))
+        goal_cells = set(engine.goal_cells)
+        level_map = []
+        for r in range(height):
+            row = ''
+            for c in range(width):
+                cell = r * engine.cols + c
+                if engine.walls[cell]:
+                    row += '#'
+                elif cell == player_cell:
+                    row += '+' if cell in goal_cells else '@'
+                elif cell in box_cells:
+                    row += '*' if cell in goal_cells else '$'
+                else:
+                    row += 'G' if cell in goal_cells else ' '
+            level_map.append(row)
+        return level_map
+
+
+def corpus(collection=None):
+    """[(name, level_map)] for the bundled, generated and (optionally)
+    collection levels."""
+    levels = list(BUNDLED_LEVELS.items())
+    for width, height, boxes, seed in GENERATED_LEVELS:
+        levels.append((f"gen-{width}x{height}-{boxes}b-s{seed}",
+                       generate_level(width, height, boxes, seed)))
+    if collection:
+        levels.extend(iter_levels(collection))
+    return levels
+
+
+def run_pair(algorithm, level_map, warmup, repeats, timeout, results):
+    """Process target: time one algorithm on one level and put (run
+    records, peak RSS, error or None) on results."""
+    runs = []
+    try:
+        level = sokoban.make_level(level_map)
+        limits = sokoban.Limits(time=timeout)
+        for _ in range(warmup):
+            random.seed(RUN_SEED)
+            sokoban.solve(level, limits, algorithm)
+        for _ in range(repeats):
+            random.seed(RUN_SEED)
+            result = sokoban.solve(level, limits, algorithm)
+            runs.append({'status': result.status,
+                         'seconds': result.seconds,
+                         'nodes': result.stats.get('nodes_expanded'),
+                         'moves': len(result.moves) if result.solved else None})
+    except Exception as error:
+        results.put((runs, None, repr(error)))
+        return
+    results.put((runs, peak_rss(), None))
+
+
+def benchmark_pair(algorithm, name, level_map, warmup=1, repeats=3, timeout=30.0):
+    """Summary record for one (algorithm, level) pair."""
+    results = multiprocessing.Queue()
+    worker = multiprocessing.Process(target=run_pair,
+                                     args=(algorithm, level_map, warmup, repeats, timeout, results),
+                                     daemon=True)
+    worker.start()
+    # Every run stops itself at timeout; the margin covers imports and
+    # the cancel checks, after which the worker is killed.
+    try:
+        runs, rss, error = results.get(timeout=(warmup + repeats) * (timeout + 5) + 10)
+    except queue.Empty:
+        worker.terminate()
+        worker.join()
+        return {'algorithm': algorithm, 'level': name, 'status': 'killed', 'runs': []}
+    worker.join()
+    if error is not None:
+        return {'algorithm': algorithm, 'level': name, 'status': 'error', 'error': error,
+                'runs': runs}
+
+    seconds = [run['seconds'] for run in runs]
+    median = statistics.median(seconds)
+    nodes = [run['nodes'] for run in runs if run['nodes'] is not None]
+    node_count = int(statistics.median(nodes)) if nodes else None
+    statuses = [run['status'] for run in runs]
+    return {
+        'algorithm': algorithm,
+        'level': name,
+        'status': max(set(statuses), key=statuses.count),
+        'seconds': round(median, 6),
+        'best_seconds': round(min(seconds), 6),
+        'nodes': node_count,
+        'nodes_per_second': round(node_count / median) if node_count and median > 0 else None,
+        'moves': next((run['moves'] for run in runs if run['moves'] is not None), None),
+        'peak_rss': rss,
+        'runs': runs,
+    }
+
+
+def run_benchmark(algorithms=DEFAULT_ALGORITHMS, levels=None, warmup=1, repeats=3,
+                  timeout=30.0, progress=None):
+    """Benchmark every algorithm on every (name, level_map) of levels
+    (default: corpus()); returns the JSON-ready report."""
+    levels = corpus() if levels is None else levels
+    records = []
+    for name, level_map in levels:
+        for algorithm in algorithms:
+            record = benchmark_pair(algorithm, name, level_map, warmup, repeats, timeout)
+            records.append(record)
+            if progress is not None:
+                progress(record)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'warmup': warmup,
+            'repeats': repeats,
+            'timeout': timeout,
+        },
+        'results': records,
+    }
+
+
+def format_row(record):
+    def show(value, fmt='{}'):
+        return '-' if value is None else fmt.format(value)
+    rss = record.get('peak_rss')
+    return (f"{record['algorithm']:<14}{record['level']:<22}{record['status']:<10}"
+            f"{show(record.get('seconds'), '{:.4f}'):>10}{show(record.get('nodes')):>10}"
+            f"{show(record.get('nodes_per_second')):>11}"
+            f"{show(rss and rss / 2 ** 20, '{:.1f}'):>9}{show(record.get('moves')):>7}")
+
+
+TABLE_HEADER = (f"{'algorithm':<14}{'level':<22}{'status':<10}{'seconds':>10}{'nodes':>10}"
+                f"{'nodes/s':>11}{'RSS MB':>9}{'moves':>7}")
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Lines describing pairs that got slower than baseline by more than
+    tolerance (a fraction) or whose outcome, node count or solution
+    length changed.  Speed is compared on the fastest run of each pair,
+    and only for pairs that took at least MIN_COMPARE_SECONDS."""
+    old = {(record['algorithm'], record['level']): record for record in baseline['results']}
+    lines = []
+    for record in report['results']:
+        before = old.get((record['algorithm'], record['level']))
+        if before is None:
+            continue
+        pair = f"{record['algorithm']} on {record['level']}"
+        if record['status'] != before['status']:
+            lines.append(f"{pair}: {before['status']} -> {record['status']}")
+            continue
+        old_time, new_time = before.get('best_seconds'), record.get('best_seconds')
+        if old_time and new_time and max(old_time, new_time) >= MIN_COMPARE_SECONDS:
+            ratio = new_time / old_time
+            if ratio > 1 + tolerance:
+                lines.append(f"{pair}: {ratio:.2f}x slower ({old_time:.4f}s -> {new_time:.4f}s)")
+        for field in ('nodes', 'moves'):
+            if record.get(field) != before.get(field):
+                lines.append(f"{pair}: {field} {before.get(field)} -> {record.get(field)}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--algorithms', nargs='+', default=list(DEFAULT_ALGORITHMS),
+                        choices=sokoban.ALGORITHMS, metavar='ALGORITHM')
+    parser.add_argument('--levels', nargs='+', default=None,
+                        help='names of corpus levels to run (default: all)')
+    parser.add_argument('--collection', default=None, help='XSB file with more levels')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds per run')
+    parser.add_argument('--json', default=None, help='write the report to this file')
+    parser.add_argument('--compare', default=None, help='earlier JSON report to check against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='slowdown reported by --compare (default: 0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    levels = corpus(args.collection)
+    if args.levels:
+        levels = [(name, level_map) for name, level_map in levels if name in args.levels]
+
+    print(TABLE_HEADER)
+    report = run_benchmark(args.algorithms, levels, args.warmup, args.repeats, args.timeout,
+                           progress=lambda record: print(format_row(record), flush=True))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            changes = compare(report, json.load(f), args.tolerance)
+        print(f"\nCompared with {args.compare}:")
+        for line in changes or ["no changes"]:
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
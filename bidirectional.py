@@ -0,0 +1,214 @@
+"""Bidirectional push-level BFS: forward pushes meet backward pulls.
+
+The forward half is BFS.py's push-level search from the start state.
+The backward half starts from every solved configuration (boxes on the
+goals, player in any region around them) and applies pulls, the exact
+reverse of pushes.  Both halves store normalized keys (player on the
+smallest cell of its region, see PackedLevel.normalize), so a state
+reached from both sides has the same key in both visited tables.
+
+The side with the smaller frontier is expanded one whole layer at a
+time; when that layer produces states the other side has seen, the
+cheapest meeting point is taken, which keeps the solution optimal in
+pushes while each side only searches about half the depth.
+"""
+from itertools import combinations
+
+from deadlocks import dead_squares, freeze_detector, push_distances
+from search_core import cancelled, logger, record, record_stop
+from state_engine import as_level
+
+LEVEL_MAP = [
+    "#######",
+    "#@.$ G#",
+    "#.#.#.#",
+    "#.$ G #",
+    "#######"
+]
+
+MOVES = {
+    'Up': (-1, 0),
+    'Down': (1, 0),
+    'Left': (0, -1),
+    'Right': (0, 1)
+}
+
+
+def goal_states(engine):
+    """Normalized keys of every solved state: each way to cover goals
+    with the boxes, times each player region left around them."""
+    box_count = len(engine.box_cells(engine.start_key))
+    states = []
+    for goals in combinations(engine.goal_cells, box_count):
+        boxes = 0
+        for cell in goals:
+            boxes |= 1 << cell
+        covered = bytearray(engine.size)
+        for cell in range(engine.size):
+            if engine.walls[cell] or covered[cell] or (boxes >> cell) & 1:
+                continue
+            seen, min_cell = engine.reachable(engine.encode(cell, boxes))
+            for other in range(engine.size):
+                if seen[other]:
+                    covered[other] = 1
+            states.append(engine.encode(min_cell, boxes))
+    return states
+
+
+def pull_successors(engine, key, unreachable=None):
+    """Yield (push, previous_key) for every legal pull from key.
+
+    push is the forward push (box_cell * 4 + direction, as in
+    push_successors) that leads from previous_key back to key.  Pulls
+    that put a box on a cell where unreachable[cell] is set (no start box
+    can ever be pushed there) are skipped.
+    """
+    pb = engine.player_bits
+    boxes = key >> pb
+    seen = engine.reachable(key)[0]
+    neighbours = engine.neighbours
+
+    for box in engine.box_cells(key):
+        steps = neighbours[box]
+        for d in range(4):
+            # The player stands next to the box on side d and walks one
+            # more step along d, dragging the box onto the cell it left.
+            stand = steps[d]
+            if stand < 0 or not seen[stand]:
+                continue
+            back = neighbours[stand][d]
+            if back < 0 or (boxes >> back) & 1:
+                continue
+            if unreachable is not None and unreachable[stand]:
+                continue
+            moved = boxes ^ (1 << box) ^ (1 << stand)
+            yield stand * 4 + (d ^ 1), engine.normalize((moved << pb) | back)
+
+
+def solve_sokoban_bidirectional(level_map, prune_dead=True, detect_freeze=True, cancel=None,
+                                quiet=False, stats=None, probe=None):
+    """Push-optimal solution as a list of move names, or None.
+
+    prune_dead/detect_freeze prune the forward side as in BFS.py; the
+    backward side drops states with a box on a cell that no start box
+    can be pushed to.  probe is looked at once per layer.
+    """
+    engine = as_level(level_map)
+    log = logger(quiet)
+    move_names = list(MOVES)
+    start_key = engine.normalize(engine.start_key)
+
+    if engine.is_solved(start_key):
+        log("Puzzle already solved!")
+        return []
+
+    dead = dead_squares(engine) if prune_dead else None
+    detector = freeze_detector(engine) if detect_freeze else None
+    reach = push_distances(engine, engine.box_cells(engine.start_key))
+    unreachable = bytearray(1 if d < 0 else 0 for d in reach) if prune_dead else None
+
+    # key -> (neighbouring key towards the root, push, depth)
+    forward = {start_key: (None, 0, 0)}
+    backward = {key: (None, 0, 0) for key in goal_states(engine)}
+    forward_layer = [start_key]
+    backward_layer = list(backward)
+    nodes_explored = 0
+    stopped = False
+
+    while forward_layer and backward_layer:
+        best = None
+        if len(forward_layer) <= len(backward_layer):
+            next_layer = []
+            for key in forward_layer:
+                nodes_explored += 1
+                if cancelled(cancel, nodes_explored):
+                    stopped = True
+                    break
+                depth = forward[key][2] + 1
+                for push, next_key, pushed_to in engine.push_successors(key, dead):
+                    if next_key in forward:
+                        continue
+                    if detector is not None and detector.is_deadlocked(next_key, pushed_to):
+                        continue
+                    forward[next_key] = (key, push, depth)
+                    next_layer.append(next_key)
+                    if next_key in backward:
+                        cost = depth + backward[next_key][2]
+                        if best is None or cost < best[0]:
+                            best = (cost, next_key)
+            forward_layer = next_layer
+        else:
+            next_layer = []
+            for key in backward_layer:
+                nodes_explored += 1
+                if cancelled(cancel, nodes_explored):
+                    stopped = True
+                    break
+                depth = backward[key][2] + 1
+                for push, prev_key in pull_successors(engine, key, unreachable):
+                    if prev_key in backward:
+                        continue
+                    backward[prev_key] = (key, push, depth)
+                    next_layer.append(prev_key)
+                    if prev_key in forward:
+                        cost = depth + forward[prev_key][2]
+                        if best is None or cost < best[0]:
+                            best = (cost, prev_key)
+            backward_layer = next_layer
+
+        if stopped:
+            log("Search cancelled")
+            record(stats, nodes_expanded=nodes_explored, visited=len(forward) + len(backward))
+            if stats is not None:
+                # Partial result: the first forward state with the fewest
+                # boxes off the goals.
+                closest = min(forward, key=engine.boxes_left)
+                pushes = join_paths(forward, {closest: (None, 0, 0)}, closest)
+                path = engine.expand_pushes(engine.start_key, pushes)
+                record(stats, partial=[move_names[move] for move in path],
+                       boxes_left=engine.boxes_left(closest))
+                record_stop(stats, cancel)
+            return None
+
+        if probe is not None and probe.due(nodes_explored):
+            probe.snapshot(nodes_expanded=nodes_explored, generated=len(forward) + len(backward),
+                           frontier=len(forward_layer) + len(backward_layer))
+
+        if best is not None:
+            pushes = join_paths(forward, backward, best[1])
+            path = engine.expand_pushes(engine.start_key, pushes)
+            log(f"Solution found ({best[0]} pushes, {len(path)} moves).")
+            log(f"Nodes Explored: {nodes_explored} "
+                f"(forward {len(forward)}, backward {len(backward)} states)")
+            record(stats, nodes_expanded=nodes_explored, visited=len(forward) + len(backward))
+            return [move_names[move] for move in path]
+
+    log("Puzzle is unsolvable.")
+    log(f"Nodes Explored: {nodes_explored}")
+    record(stats, nodes_expanded=nodes_explored, visited=len(forward) + len(backward))
+    return None
+
+
+def join_paths(forward, backward, meet):
+    """Pushes from the start to meet, then from meet to a goal state."""
+    pushes = []
+    key = meet
+    while forward[key][0] is not None:
+        key, push, _ = forward[key]
+        pushes.append(push)
+    pushes.reverse()
+
+    key = meet
+    while backward[key][0] is not None:
+        key, push, _ = backward[key]
+        pushes.append(push)
+    return pushes
+
+
+if __name__ == "__main__":
+    print("... Starting bidirectional search ...")
+    solution = solve_sokoban_bidirectional(LEVEL_MAP)
+
+    if solution:
+        print("\nSolution Move Sequence:")
+        print(" -> ".join(solution))
@@ -0,0 +1,95 @@
+"""Search budgets: wall-clock time, expansions and memory.
+
+A Budget is passed to a solver as its cancel token.  The solvers poll
+their token every CANCEL_CHECK_EVERY expansions (GA: once per
+generation; parallel BFS: after every chunk of that many states per
+worker) through search_core.cancelled()/interrupted(), which first
+charge the budget with the expansion count, so a node budget can be
+overshot by up to that many expansions.  Once a limit is hit the budget stays set, and
+its reason ('time', 'nodes', 'memory' or 'cancelled') says which one.
+
+A stopped solver still returns None, but the stats dict it was given
+gets 'stopped' (the reason) and, where the solver can tell, 'partial':
+the moves to the best state it reached (fewest boxes off the goals; for
+GA the fittest chromosome, for hill climbing the path climbed so far)
+and 'boxes_left' for that state.
+
+Memory is the resident set size of the whole process, read from
+/proc/self/statm on Linux.  Elsewhere the peak RSS from
+resource.getrusage() is used, and where neither exists (Windows) the
+memory limit is ignored.
+"""
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+class Budget:
+    """Limits for one search, used as the solver's cancel token.
+
+    seconds: wall-clock time from the Budget's creation.
+    nodes: expansions (GA: chromosomes scored).
+    memory: process RSS in bytes.
+    cancel: an outside token (anything with is_set()) that also stops
+    the search.  A limit left as None is not checked.
+    """
+
+    def __init__(self, seconds=None, nodes=None, memory=None, cancel=None):
+        self.seconds = seconds
+        self.nodes = nodes
+        self.memory = memory
+        self.cancel = cancel
+        self.stop_at = None if seconds is None else time.monotonic() + seconds
+        self.spent = 0
+        self.reason = None
+
+    def charge(self, count):
+        """Record that the search has made count expansions so far."""
+        self.spent = count
+
+    def is_set(self):
+        if self.reason is None:
+            self.reason = self.exceeded()
+        return self.reason is not None
+
+    def exceeded(self):
+        """The first limit that is used up, or None."""
+        if self.cancel is not None and self.cancel.is_set():
+            return 'cancelled'
+        if self.stop_at is not None and time.monotonic() >= self.stop_at:
+            return 'time'
+        if self.nodes is not None and self.spent >= self.nodes:
+            return 'nodes'
+        if self.memory is not None:
+            rss = current_rss()
+            if rss is not None and rss >= self.memory:
+                return 'memory'
+        return None
@@ -0,0 +1,172 @@
+"""Deadlock analysis shared by the Sokoban solvers.
+
+A "simple dead" square is a floor cell from which a box can never be
+pushed onto any goal, even with every other box removed.  They are found
+once per level by pulling a box backwards from every goal: a pull is the
+exact reverse of a push, so every cell a pulled box can reach is a cell
+from which a push sequence leads to a goal, and everything else is dead.
+"""
+from collections import deque
+
+
+def pull_distances(engine, sources):
+    """Minimum number of pushes that bring a box from each cell onto the
+    nearest cell in sources, ignoring all other boxes.
+
+    Returns a list indexed by cell; unreachable cells (and walls) are -1.
+    """
+    neighbours = engine.neighbours
+    dist = [-1] * engine.size
+    queue = deque()
+    for cell in sources:
+        dist[cell] = 0
+        queue.append(cell)
+
+    while queue:
+        cell = queue.popleft()
+        for d in range(4):
+            # The box arrived on `cell` from `prev` by a push in direction
+            # d ^ 1, so the player stood one step further along d.
+            prev = neighbours[cell][d]
+            if prev < 0 or dist[prev] >= 0:
+                continue
+            if neighbours[prev][d] < 0:
+                continue
+            dist[prev] = dist[cell] + 1
+            queue.append(prev)
+    return dist
+
+
+def push_distances(engine, sources):
+    """Minimum number of pushes that bring a box from the nearest cell in
+    sources onto each cell, ignoring all other boxes; the forward twin of
+    pull_distances().  Cells no box can reach are -1."""
+    neighbours = engine.neighbours
+    dist = [-1] * engine.size
+    queue = deque()
+    for cell in sources:
+        dist[cell] = 0
+        queue.append(cell)
+
+    while queue:
+        cell = queue.popleft()
+        for d in range(4):
+            nxt = neighbours[cell][d]
+            if nxt < 0 or dist[nxt] >= 0:
+                continue
+            # The player has to stand on the opposite side.
+            if neighbours[cell][d ^ 1] < 0:
+                continue
+            dist[nxt] = dist[cell] + 1
+            queue.append(nxt)
+    return dist
+
+
+def dead_squares(engine):
+    """Boolean lookup table: dead[cell] is 1 when a box on cell can never
+    reach a goal.  Computed once and cached on the engine."""
+    dead = getattr(engine, '_dead_squares', None)
+    if dead is None:
+        dist = pull_distances(engine, engine.goal_cells)
+        dead = bytearray(1 if d < 0 else 0 for d in dist)
+        engine._dead_squares = dead
+    return dead
+
+
+# Freeze detection only looks at boxes within this Chebyshev radius of
+# the pushed box.  Boxes further away are treated as absent, which can
+# only hide a deadlock, never invent one, and makes the result a pure
+# function of the local neighbourhood so it can be cached.
+FREEZE_RADIUS = 2
+
+
+class FreezeDetector:
+    """Dynamic deadlock check for freshly pushed boxes.
+
+    A box is frozen when it can move along neither axis: along an axis it
+    is blocked by a wall, by simple dead squares on both sides, or by a
+    neighbouring box that is itself frozen (the box being tested counts as
+    a wall while its neighbour is checked).  This covers 2x2 blocks and
+    boxes frozen in a line against a wall.  A frozen group is a deadlock
+    unless every box in it sits on a goal.
+
+    Results are cached keyed by (pushed cell, boxes in its window), and
+    hits/misses/pruned count how useful the cache and the check are.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.dead = dead_squares(engine)
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+
+        cols = engine.cols
+        self.windows = []
+        for cell in range(engine.size):
+            r, c = divmod(cell, cols)
+            mask = 0
+            for wr in range(max(0, r - FREEZE_RADIUS), min(engine.rows, r + FREEZE_RADIUS + 1)):
+                for wc in range(max(0, c - FREEZE_RADIUS), min(cols, c + FREEZE_RADIUS + 1)):
+                    mask |= 1 << (wr * cols + wc)
+            self.windows.append(mask)
+
+    def is_deadlocked(self, key, pushed_to):
+        """True when the box just pushed onto pushed_to is part of a
+        frozen group that is not entirely on goals."""
+        local = (key >> self.engine.player_bits) & self.windows[pushed_to]
+        pattern = (pushed_to, local)
+        result = self.cache.get(pattern)
+        if result is None:
+            self.misses += 1
+            frozen = []
+            result = (self._frozen(pushed_to, local, frozenset(), frozen)
+                      and any(not (self.engine.goal_mask >> cell) & 1 for cell in frozen))
+            self.cache[pattern] = result
+        else:
+            self.hits += 1
+        if result:
+            self.pruned += 1
+        return result
+
+    def _frozen(self, cell, boxes, blocked, frozen):
+        neighbours = self.engine.neighbours[cell]
+        dead = self.dead
+        blocked = blocked | {cell}
+        found = []
+        for axis in (0, 2):
+            a, b = neighbours[axis], neighbours[axis + 1]
+            if a < 0 or b < 0 or a in blocked or b in blocked:
+                continue
+            if dead[a] and dead[b]:
+                continue
+            sub = []
+            if (((boxes >> a) & 1 and self._frozen(a, boxes, blocked, sub))
+                    or ((boxes >> b) & 1 and self._frozen(b, boxes, blocked, sub))):
+                found.extend(sub)
+                continue
+            return False
+        frozen.append(cell)
+        frozen.extend(found)
+        return True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"Freeze check: {lookups} lookups, {self.hits} cache hits "
+                f"({rate:.0%}), {self.pruned} states pruned")
+
+
+def freeze_detector(engine):
+    """Shared FreezeDetector for the engine's level.
+
+    Cached on the engine like dead_squares(), so the pattern cache
+    carries over between solver runs given the same PackedLevel and is
+    freed with it.
+    """
+    detector = getattr(engine, '_freeze_detector', None)
+    if detector is None:
+        detector = FreezeDetector(engine)
+        engine._freeze_detector = detector
+    return detector
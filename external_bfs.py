@@ -0,0 +1,262 @@
+"""External-memory (disk-backed) BFS for levels too big for the visited set.
+
+Each BFS layer is a file of packed keys, written as fixed-width
+big-endian integers in sorted order, so byte order equals key order and
+files can be merged as streams.  Building layer d + 1:
+
+1. Stream layer d from its memory-mapped file and expand every key.
+   Successors go into an in-memory buffer of at most buffer_states keys;
+   a full buffer is sorted and written out as a run file.
+2. Merge the runs, dropping duplicates, and merge the result against
+   the visited file, the sorted union of every earlier layer, dropping
+   keys seen before (pushes cannot be undone, so a state can reappear
+   at any earlier depth).
+3. What survives is written as layer d + 1 and merged into the visited
+   file.
+
+Only the buffer and one key per open stream live in memory, and at most
+MERGE_FANIN run files are open at once.  There are no parent pointers:
+once a solved key turns up, the path is rebuilt backwards by scanning
+each earlier layer for a key with a successor equal to the current one.
+"""
+import heapq
+import mmap
+import os
+import shutil
+import tempfile
+from functools import partial
+
+from deadlocks import dead_squares, freeze_detector
+from search_core import cancelled, logger, record, record_stop
+from state_engine import as_level
+
+LEVEL_MAP = [
+    "#######",
+    "#@.$ G#",
+    "#.#.#.#",
+    "#.$ G #",
+    "#######"
+]
+
+MOVES = {
+    'Up': (-1, 0),
+    'Down': (1, 0),
+    'Left': (0, -1),
+    'Right': (0, 1)
+}
+
+# Successors kept in memory before they are sorted and spilled to disk.
+BUFFER_STATES = 1000000
+
+# Run files merged in one pass; more runs are first merged into one.
+MERGE_FANIN = 64
+
+
+def read_keys(path, width):
+    """Yield the keys stored in a sorted key file, in order."""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), width):
+                yield int.from_bytes(data[start:start + width], 'big')
+
+
+def unique(keys):
+    """Drop repeats from a sorted stream of keys."""
+    last = None
+    for key in keys:
+        if key != last:
+            yield key
+            last = key
+
+
+def write_keys(path, keys, width):
+    with open(path, 'wb') as f:
+        for key in keys:
+            f.write(key.to_bytes(width, 'big'))
+
+
+class LayerStore:
+    """The layer and run files of one search, in a private directory."""
+
+    def __init__(self, engine, work_dir=None):
+        # Widest possible key: every cell a box, plus the player index.
+        self.width = (engine.size + engine.player_bits + 7) // 8
+        self.directory = tempfile.mkdtemp(prefix='sokoban-bfs-', dir=work_dir)
+        self.visited = os.path.join(self.directory, 'visited.bin')
+        open(self.visited, 'wb').close()
+        self.layers = []
+        self.runs = []
+
+    def layer_keys(self, depth):
+        return read_keys(self.layers[depth], self.width)
+
+    def spill(self, buffer):
+        """Write the buffer as a sorted run and empty it."""
+        if len(self.runs) >= MERGE_FANIN:
+            self.runs = [self._merge_runs()]
+        write_keys(self._run_path(), sorted(buffer), self.width)
+        self.runs.append(self._run_path())
+        buffer.clear()
+
+    def _run_path(self):
+        return os.path.join(self.directory, f'run-{len(self.runs)}.bin')
+
+    def _merge_runs(self):
+        """Merge every run into one duplicate-free run file."""
+        path = os.path.join(self.directory, 'run-merged.bin')
+        keys = heapq.merge(*(read_keys(run, self.width) for run in self.runs))
+        write_keys(path + '.tmp', unique(keys), self.width)
+        for run in self.runs:
+            os.remove(run)
+        os.replace(path + '.tmp', path)
+        return path
+
+    def add_layer(self, is_solved=None):
+        """Merge the pending runs into the next layer file, minus the
+        visited keys, then fold the new layer into the visited file.
+
+        Returns (count, solved_key); with is_solved given, the merge stops
+        at the first key it accepts.
+        """
+        width = self.width
+        path = os.path.join(self.directory, f'layer-{len(self.layers)}.bin')
+        previous = read_keys(self.visited, width)
+        old = next(previous, None)
+        count = 0
+        solved = None
+
+        with open(path, 'wb') as out:
+            candidates = heapq.merge(*(read_keys(run, width) for run in self.runs))
+            for key in unique(candidates):
+                while old is not None and old < key:
+                    old = next(previous, None)
+                if old == key:
+                    continue
+                out.write(key.to_bytes(width, 'big'))
+                count += 1
+                if is_solved is not None and is_solved(key):
+                    solved = key
+                    break
+        previous.close()
+
+        for run in self.runs:
+            os.remove(run)
+        self.runs = []
+        self.layers.append(path)
+
+        if solved is None:
+            merged = heapq.merge(read_keys(self.visited, width), read_keys(path, width))
+            write_keys(self.visited + '.tmp', merged, width)
+            os.replace(self.visited + '.tmp', self.visited)
+        return count, solved
+
+    def disk_bytes(self):
+        return (os.path.getsize(self.visited)
+                + sum(os.path.getsize(path) for path in self.layers))
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def solve_sokoban_external_bfs(level_map, push_level=False, prune_dead=True, detect_freeze=True,
+                               buffer_states=BUFFER_STATES, work_dir=None, cancel=None,
+                               quiet=False, stats=None, probe=None):
+    """BFS with the visited set on disk; same result as BFS.py.
+
+    work_dir is where the temporary layer files go (default: the system
+    temp directory); they are removed when the search ends.  probe is
+    looked at once per layer.
+    """
+    engine = as_level(level_map)
+    log = logger(quiet)
+    move_names = list(MOVES)
+    start_key = engine.start_key
+
+    dead = dead_squares(engine) if prune_dead else None
+    detector = freeze_detector(engine) if detect_freeze else None
+    if push_level:
+        expand = partial(engine.push_successors, dead=dead)
+        start_key = engine.normalize(start_key)
+    else:
+        expand = partial(engine.successors, dead=dead)
+
+    if engine.is_solved(start_key):
+        log(" Puzzle already solved!")
+        return []
+
+    store = LayerStore(engine, work_dir)
+    try:
+        store.spill([start_key])
+        store.add_layer()
+        nodes_explored = 0
+        depth = 0
+        buffer = set()
+
+        while True:
+            keys = store.layer_keys(depth)
+            for key in keys:
+                nodes_explored += 1
+                if cancelled(cancel, nodes_explored):
+                    keys.close()
+                    log(" Search cancelled.")
+                    record(stats, nodes_expanded=nodes_explored, disk_bytes=store.disk_bytes())
+                    record_stop(stats, cancel)
+                    return None
+                for _, next_key, pushed_to in expand(key):
+                    if pushed_to >= 0 and detector is not None and detector.is_deadlocked(next_key, pushed_to):
+                        continue
+                    buffer.add(next_key)
+                    if len(buffer) >= buffer_states:
+                        store.spill(buffer)
+            if buffer:
+                store.spill(buffer)
+
+            count, solved = store.add_layer(engine.is_solved)
+            depth += 1
+            if probe is not None and probe.due(nodes_explored):
+                probe.snapshot(nodes_expanded=nodes_explored, frontier=count, depth=depth,
+                               disk_bytes=store.disk_bytes())
+            if solved is not None:
+                path = trace_back(store, expand, solved, depth)
+                if push_level:
+                    pushes = len(path)
+                    path = engine.expand_pushes(engine.start_key, path)
+                    log(f" Solution found ({pushes} pushes, {len(path)} moves).")
+                else:
+                    log(f" Solution found (Shortest path: {len(path)} moves, depth {depth}).")
+                log(f" Nodes Explored: {nodes_explored}, "
+                    f"{store.disk_bytes()} bytes of layer files")
+                record(stats, nodes_expanded=nodes_explored, disk_bytes=store.disk_bytes())
+                return [move_names[move] for move in path]
+            if count == 0:
+                log(" Puzzle is unsolvable.")
+                log(f" Nodes Explored: {nodes_explored}")
+                record(stats, nodes_expanded=nodes_explored, disk_bytes=store.disk_bytes())
+                return None
+    finally:
+        store.close()
+
+
+def trace_back(store, expand, key, depth):
+    """Moves leading from the start (layer 0) to key in layer depth."""
+    path = []
+    for layer in range(depth - 1, -1, -1):
+        for parent in store.layer_keys(layer):
+            move = next((move for move, next_key, _ in expand(parent) if next_key == key), None)
+            if move is not None:
+                path.append(move)
+                key = parent
+                break
+    path.reverse()
+    return path
+
+
+if __name__ == "__main__":
+    print("... Starting external-memory BFS search ...")
+    solution = solve_sokoban_external_bfs(LEVEL_MAP)
+
+    if solution:
+        print("\nSolution Move Sequence:")
+        print(" -> ".join(solution))
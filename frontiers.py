@@ -0,0 +1,124 @@
+"""Open lists for the cost-ordered solvers (UCS and A*).
+
+Both frontiers store opaque items (node indices) under a small
+non-negative integer priority and share the same interface:
+
+    push(priority, g, item)
+    pop() -> (priority, g, item)
+    len(frontier)
+
+HeapFrontier is a binary heap (O(log n) per operation).  BucketFrontier
+keeps one bucket per priority value and, inside it, one list per g, so
+push and pop are O(1) apart from skipping empty buckets and picking the
+g to pop; priorities in Sokoban grow slowly, so both scans are short.
+"""
+import heapq
+from collections import deque
+from operator import index
+
+
+class HeapFrontier:
+    """heapq-based frontier; ties on priority go to higher g when
+    prefer_high_g is set, then to the earliest insertion."""
+
+    def __init__(self, prefer_high_g=True):
+        self.heap = []
+        self.sign = -1 if prefer_high_g else 1
+        self.counter = 0
+
+    def push(self, priority, g, item):
+        self.counter += 1
+        heapq.heappush(self.heap, (priority, self.sign * g, self.counter, item))
+
+    def pop(self):
+        priority, g, _, item = heapq.heappop(self.heap)
+        return priority, self.sign * g, item
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class BucketFrontier:
+    """Bucket (radix) queue indexed by priority, then by g.
+
+    prefer_high_g pops the deepest g first within a priority, which
+    drives A* towards the goal on plateaus of equal f.  lifo pops the
+    most recently pushed item of a bucket first; lifo=False gives FIFO
+    order inside a bucket.
+
+    Priorities must be integers (TypeError otherwise).  Items with
+    g == priority (every item in UCS, h = 0 in A*) go straight into the
+    bucket's own list; the other g values get a list each in a dict
+    keyed by g, which only holds the g values present.
+    """
+
+    def __init__(self, prefer_high_g=True, lifo=True):
+        self.same = []
+        self.by_g = []
+        self.counts = []
+        self.prefer_high_g = prefer_high_g
+        self.lifo = lifo
+        self.min_priority = 0
+        self.size = 0
+
+    def _tier(self):
+        return [] if self.lifo else deque()
+
+    def push(self, priority, g, item):
+        try:
+            priority = index(priority)
+        except TypeError:
+            raise TypeError(f"bucket frontier priorities must be integers, "
+                            f"got {priority!r}") from None
+        same = self.same
+        while len(same) <= priority:
+            same.append(self._tier())
+            self.by_g.append({})
+            self.counts.append(0)
+        if g == priority:
+            same[priority].append(item)
+        else:
+            by_g = self.by_g[priority]
+            tier = by_g.get(g)
+            if tier is None:
+                tier = by_g[g] = self._tier()
+            tier.append(item)
+        self.counts[priority] += 1
+        if priority < self.min_priority:
+            self.min_priority = priority
+        self.size += 1
+
+    def pop(self):
+        if not self.size:
+            raise IndexError("pop from an empty frontier")
+        counts = self.counts
+        priority = self.min_priority
+        while not counts[priority]:
+            priority += 1
+        self.min_priority = priority
+        by_g = self.by_g[priority]
+
+        g = priority
+        if by_g:
+            other = max(by_g) if self.prefer_high_g else min(by_g)
+            if not self.same[priority] or (other > g) == self.prefer_high_g:
+                g = other
+        bucket = self.same[priority] if g == priority else by_g[g]
+        item = bucket.pop() if self.lifo else bucket.popleft()
+        if not bucket and g != priority:
+            del by_g[g]
+        counts[priority] -= 1
+        self.size -= 1
+        return priority, g, item
+
+    def __len__(self):
+        return self.size
+
+
+def make_frontier(kind, prefer_high_g=True):
+    """'heap' or 'bucket'."""
+    if kind == 'heap':
+        return HeapFrontier(prefer_high_g)
+    if kind == 'bucket':
+        return BucketFrontier(prefer_high_g)
+    raise ValueError(f"unknown frontier kind: {kind!r}")
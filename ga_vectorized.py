@@ -0,0 +1,120 @@
+"""Batched GA fitness: the whole population is simulated in lockstep.
+
+Chromosomes become one int8 move matrix (population x longest
+chromosome, -1 padding) and the players/boxes of every individual live in
+flat-index arrays, so one generation is len(chromosome) rounds of array
+operations instead of a deepcopy and a full-grid scan per gene.
+
+The rules and the score are exactly those of GA.fitness():
+
+    boxes_on_goals * 100 - distance_score * 5 - steps_used
+
+where a move only counts as a step when it changes the grid, and an
+individual stops moving as soon as all of its boxes are on goals.
+"""
+import numpy as np
+
+MOVE_CODES = {'U': 0, 'D': 1, 'L': 2, 'R': 3}
+
+
+class BatchSimulator:
+    """Fitness evaluator for one level, built from its static layout.
+
+    grid: rows of characters where '#' marks a wall
+    goals, boxes: lists of (r, c); player: (r, c)
+    dead: optional flat dead-square table; pushes onto it are blocked
+    """
+
+    def __init__(self, grid, goals, player, boxes, dead=None):
+        rows, cols = len(grid), len(grid[0])
+        self.cols = cols
+        self.wall = np.array([[cell == '#' for cell in row] for row in grid],
+                             dtype=bool).ravel()
+        if dead is not None:
+            self.push_blocked = self.wall | np.frombuffer(bytes(dead), dtype=np.uint8).astype(bool)
+        else:
+            self.push_blocked = self.wall
+        self.goal = np.zeros(rows * cols, dtype=bool)
+        for r, c in goals:
+            self.goal[r * cols + c] = True
+
+        # Distance of every cell to its nearest goal (Manhattan), so the
+        # distance score is a single gather per individual.
+        rr, cc = np.divmod(np.arange(rows * cols), cols)
+        goal_r = np.array([r for r, _ in goals])
+        goal_c = np.array([c for _, c in goals])
+        self.goal_distance = (np.abs(rr[:, None] - goal_r) + np.abs(cc[:, None] - goal_c)).min(axis=1)
+
+        # step[cell, d] is the cell reached from cell in direction d, or
+        # cell itself when that is a wall, so "did the player move" is a
+        # single comparison.  Only interior cells are ever looked up.
+        size = rows * cols
+        self.step = np.tile(np.arange(size, dtype=np.int64)[:, None], (1, 4))
+        for cell in range(size):
+            r, c = divmod(cell, cols)
+            for d, (dr, dc) in enumerate(((-1, 0), (1, 0), (0, -1), (0, 1))):
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < rows and 0 <= nc < cols and not self.wall[nr * cols + nc]:
+                    self.step[cell, d] = nr * cols + nc
+
+        self.start_player = player[0] * cols + player[1]
+        self.start_occupied = np.zeros(size, dtype=bool)
+        for r, c in boxes:
+            self.start_occupied[r * cols + c] = True
+        self.translate = bytes.maketrans(b'UDLR', bytes([0, 1, 2, 3]))
+
+    def encode(self, population):
+        """Moves as a (length x population) int8 matrix, -1 padded; one row
+        per time step keeps each step's column contiguous."""
+        length = max(len(chromosome) for chromosome in population)
+        moves = np.full((len(population), length), -1, dtype=np.int8)
+        for i, chromosome in enumerate(population):
+            codes = ''.join(chromosome).encode().translate(self.translate)
+            moves[i, :len(codes)] = np.frombuffer(codes, dtype=np.int8)
+        return np.ascontiguousarray(moves.T)
+
+    def fitness(self, population):
+        """Fitness of every chromosome, as an int64 array."""
+        moves = self.encode(population)
+        valid = moves >= 0
+        moves = np.where(valid, moves, 0).astype(np.int64)
+
+        size = len(population)
+        cells = len(self.goal)
+        base = np.arange(size, dtype=np.int64) * cells
+        step = self.step.ravel()
+        goal = self.goal.astype(np.int64)
+        push_blocked = self.push_blocked
+
+        player = np.full(size, self.start_player, dtype=np.int64)
+        occupied = np.tile(self.start_occupied, size)
+        off_goal = np.full(size, int((self.start_occupied & ~self.goal).sum()), dtype=np.int64)
+        steps_used = np.zeros(size, dtype=np.int64)
+        won = np.zeros(size, dtype=bool)
+
+        for t in range(len(moves)):
+            active = valid[t] & ~won
+            if not active.any():
+                break
+            move = moves[t]
+            target = step.take(player * 4 + move)
+            beyond = step.take(target * 4 + move)
+            has_box = occupied.take(base + target)
+            push_ok = ((beyond != target) & ~occupied.take(base + beyond)
+                       & ~push_blocked.take(beyond))
+
+            moved = active & (target != player) & (~has_box | push_ok)
+            pushed = np.flatnonzero(moved & has_box)
+            if pushed.size:
+                occupied[base[pushed] + target[pushed]] = False
+                occupied[base[pushed] + beyond[pushed]] = True
+                off_goal[pushed] += goal[target[pushed]] - goal[beyond[pushed]]
+            if pushed.size or t == 0:
+                won |= active & (off_goal == 0)
+            player = np.where(moved, target, player)
+            steps_used += moved
+
+        occupied = occupied.reshape(size, cells)
+        on_goals = (occupied & self.goal).sum(axis=1)
+        distance_score = occupied @ self.goal_distance
+        return on_goals * 100 - distance_score * 5 - steps_used
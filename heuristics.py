@@ -0,0 +1,173 @@
+"""Admissible box-to-goal heuristics for the informed solvers.
+
+MatchingHeuristic assigns every box to its own goal (Hungarian method)
+using true push distances computed over the wall map, so two boxes can no
+longer claim the same goal as in the Manhattan heuristic().  Push
+distances ignore the other boxes and every push costs at least one move,
+so the estimate never exceeds the real remaining cost and A* keeps
+returning optimal paths.
+"""
+from collections import OrderedDict
+
+from deadlocks import pull_distances
+
+# Cost used for a box that can never reach a goal; any assignment that
+# needs it means the state is unsolvable.
+UNREACHABLE = 10 ** 6
+
+CACHE_SIZE = 100000
+
+
+class MatchingHeuristic:
+    """Min-cost box/goal assignment over push distances.
+
+    Solved assignments are kept in an LRU cache keyed by box bits.  When
+    a child differs from its parent by one pushed box, the parent's
+    assignment is repaired by re-inserting just that box (one Hungarian
+    phase, O(n*m)) instead of solving from scratch (O(n*n*m)).  Levels
+    with more goals than boxes are always solved from scratch (see
+    _repair).
+    """
+
+    def __init__(self, engine, cache_size=CACHE_SIZE):
+        self.engine = engine
+        self.goals = list(engine.goal_cells)
+        per_goal = [pull_distances(engine, [goal]) for goal in self.goals]
+        self.distance = [
+            [UNREACHABLE if dist[cell] < 0 else dist[cell] for dist in per_goal]
+            for cell in range(engine.size)
+        ]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.full_solves = 0
+        self.incremental_solves = 0
+
+    def estimate(self, key, parent_key=None):
+        """Lower bound on the pushes still needed, or None when no box/goal
+        assignment exists (the state is dead)."""
+        boxes = self.engine.boxes_of(key)
+        solution = self._lookup(boxes)
+        if solution is None:
+            parent = None
+            if parent_key is not None:
+                parent = self._lookup(self.engine.boxes_of(parent_key))
+            if parent is not None:
+                solution = self._repair(parent, self.engine.boxes_of(parent_key), boxes)
+            else:
+                solution = self._solve(self.engine.box_cells(key))
+            self._store(boxes, solution)
+        cost = solution[0]
+        return None if cost >= UNREACHABLE else cost
+
+    # --- cache -----------------------------------------------------------
+
+    def _lookup(self, boxes):
+        solution = self.cache.get(boxes)
+        if solution is not None:
+            self.cache.move_to_end(boxes)
+        return solution
+
+    def _store(self, boxes, solution):
+        self.cache[boxes] = solution
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    # --- Hungarian method --------------------------------------------------
+    #
+    # Rows are boxes (1-based), columns are goals (1-based, column 0 is the
+    # usual dummy).  u/v are the dual potentials and p[j] is the row
+    # assigned to column j.  A solution is (cost, rows, u, v, p) where
+    # rows[i - 1] is the cell of the box in row i.
+
+    def _solve(self, cells):
+        self.full_solves += 1
+        n, m = len(cells), len(self.goals)
+        if n > m:
+            return (UNREACHABLE, cells, None, None, None)
+        u = [0] * (n + 1)
+        v = [0] * (m + 1)
+        p = [0] * (m + 1)
+        rows = list(cells)
+        for i in range(1, n + 1):
+            self._augment(rows, i, u, v, p)
+        return (self._cost(rows, p), rows, u, v, p)
+
+    def _repair(self, parent, parent_boxes, boxes):
+        cost, rows, u, v, p = parent
+        removed = parent_boxes & ~boxes
+        added = boxes & ~parent_boxes
+        if p is None or removed & (removed - 1) or added & (added - 1):
+            # Unsolvable parent or more than one box moved: no cheap repair.
+            return self._solve(self._cells(boxes))
+        if len(rows) < len(self.goals):
+            # With spare goals the freed goal's potential v[j] would have
+            # to return to 0, which can break the other rows' duals and
+            # make the bound too high; solve from scratch instead.
+            return self._solve(self._cells(boxes))
+        if not removed:
+            return parent
+
+        self.incremental_solves += 1
+        old_cell = removed.bit_length() - 1
+        new_cell = added.bit_length() - 1
+        rows = list(rows)
+        u = list(u)
+        v = list(v)
+        p = list(p)
+        i = rows.index(old_cell) + 1
+        rows[i - 1] = new_cell
+        for j in range(1, len(p)):
+            if p[j] == i:
+                p[j] = 0
+                break
+        # Keep the duals feasible for the new cost row, then re-insert it.
+        costs = self.distance[new_cell]
+        u[i] = min(costs[j - 1] - v[j] for j in range(1, len(v)))
+        self._augment(rows, i, u, v, p)
+        return (self._cost(rows, p), rows, u, v, p)
+
+    def _cells(self, boxes):
+        return self.engine.box_cells(self.engine.encode(0, boxes))
+
+    def _augment(self, rows, i, u, v, p):
+        """One Hungarian phase: add row i to the matching along a shortest
+        augmenting path, updating the potentials."""
+        distance = self.distance
+        m = len(v) - 1
+        minv = [float('inf')] * (m + 1)
+        used = [False] * (m + 1)
+        way = [0] * (m + 1)
+        p[0] = i
+        j0 = 0
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            costs = distance[rows[i0 - 1]]
+            delta = float('inf')
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = costs[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    def _cost(self, rows, p):
+        distance = self.distance
+        return sum(distance[rows[p[j] - 1]][j - 1] for j in range(1, len(p)) if p[j])
@@ -0,0 +1,148 @@
+"""Search instrumentation: periodic counter snapshots sent to a sink.
+
+A solver given probe=Probe(sink) calls probe.due(nodes_expanded) once
+per expansion and, when it returns True, probe.snapshot(...) with its
+counters, the same ones it records in its stats dict:
+
+    nodes_expanded  nodes expanded so far
+    generated       nodes put on the frontier
+    duplicates      successors dropped because they were visited already
+    pruned          successors dropped as freeze deadlocks (pushes onto
+                    dead squares never leave the move generator, so they
+                    are not counted)
+    frontier        current frontier size (stack depth for DFS and IDS)
+
+plus solver-specific values such as the IDS bound or the GA generation.
+Heuristic calls are timed when the solver wraps its heuristic with
+probe.timed().  Without a probe the solvers only pay for one
+"probe is not None" test per expansion; the counters above are kept in
+local ints on branches the search takes anyway.
+
+A sink is any callable taking one event dict.  MemorySink collects the
+events, JsonlSink writes them as JSON lines and LoggerSink passes them
+to the logging module.  Every event carries 'event' ('snapshot' or
+'finish'), 'label', 'elapsed' (seconds since the probe was made) and
+'rate' (expansions per second).
+"""
+import json
+import logging
+import time
+
+# Snapshots are due every SNAPSHOT_EVERY expansions by default.
+SNAPSHOT_EVERY = 10000
+
+# With a time interval the clock is read once per CLOCK_EVERY expansions.
+CLOCK_EVERY = 256
+
+
+class Probe:
+    """Counters of one search and the schedule of its snapshots.
+
+    every: a snapshot every that many expansions (None: never by count).
+    interval: a snapshot whenever that many seconds have passed since
+    the last one (None: never by time).
+    """
+
+    def __init__(self, sink, every=SNAPSHOT_EVERY, interval=None, label=None):
+        self.sink = sink
+        self.every = every
+        self.interval = interval
+        self.label = label
+        self.start = time.perf_counter()
+        self.next_at = every if every else float('inf')
+        self.next_time = self.start + interval if interval else None
+        self.heuristic_calls = 0
+        self.heuristic_seconds = 0.0
+        self.snapshots = 0
+
+    def due(self, expanded):
+        """True when a snapshot should be taken at this expansion count."""
+        if expanded >= self.next_at:
+            return True
+        return (self.next_time is not None and expanded % CLOCK_EVERY == 0
+                and time.perf_counter() >= self.next_time)
+
+    def timed(self, function):
+        """function wrapped to add its calls and time to the heuristic
+        counters."""
+        clock = time.perf_counter
+
+        def timed_function(*args):
+            started = clock()
+            try:
+                return function(*args)
+            finally:
+                self.heuristic_calls += 1
+                self.heuristic_seconds += clock() - started
+        return timed_function
+
+    def event(self, kind, counters):
+        elapsed = time.perf_counter() - self.start
+        event = {'event': kind, 'label': self.label, 'elapsed': round(elapsed, 6)}
+        event.update(counters)
+        expanded = counters.get('nodes_expanded')
+        if expanded is not None and elapsed > 0:
+            event['rate'] = round(expanded / elapsed, 1)
+        if self.heuristic_calls:
+            event['heuristic_calls'] = self.heuristic_calls
+            event['heuristic_seconds'] = round(self.heuristic_seconds, 6)
+        return event
+
+    def snapshot(self, **counters):
+        """Send a snapshot of counters and schedule the next one."""
+        self.snapshots += 1
+        expanded = counters.get('nodes_expanded', 0)
+        if self.every:
+            self.next_at = expanded + self.every
+        if self.interval:
+            self.next_time = time.perf_counter() + self.interval
+        self.sink(self.event('snapshot', counters))
+
+    def finish(self, status, **counters):
+        """Send the final event of the search (status is e.g. 'solved')."""
+        counters['status'] = status
+        self.sink(self.event('finish', counters))
+
+
+class MemorySink:
+    """Keeps every event in the events list."""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def snapshots(self):
+        return [event for event in self.events if event['event'] == 'snapshot']
+
+
+class JsonlSink:
+    """Writes one JSON line per event to path (appending) or to an open
+    text file; lines are flushed as they are written."""
+
+    def __init__(self, target):
+        self.owned = isinstance(target, str)
+        self.file = open(target, 'a') if self.owned else target
+
+    def __call__(self, event):
+        self.file.write(json.dumps(event) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+
+
+class LoggerSink:
+    """Logs each event as one "key=value ..." line."""
+
+    def __init__(self, logger='sokoban.search', level=logging.INFO):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def __call__(self, event):
+        fields = ' '.join(f"{key}={value}" for key, value in event.items()
+                          if key not in ('event', 'label'))
+        self.logger.log(self.level, "%s %s: %s", event['label'] or 'search',
+                        event['event'], fields)
@@ -0,0 +1,116 @@
+"""Reading levels in the standard XSB (.xsb / .sok) format.
+
+XSB cells:
+
+    #  wall             .  goal
+    @  player           +  player on a goal
+    $  box              *  box on a goal
+    space, - or _  floor
+
+The solvers use their own notation, where 'G' is a goal and '.' is plain
+floor, so parse_xsb() rewrites '.' to 'G' and the floor aliases to
+spaces; '+' and '*' are understood by PackedLevel as they are.
+
+A collection file holds many levels separated by blank lines, comment
+lines starting with ';' and "Key: value" lines such as "Title: ...".
+iter_levels() streams it one level at a time, so collections with
+thousands of levels never have to be loaded whole.
+"""
+XSB_CELLS = set('#@+$*. -_')
+
+TRANSLATE = str.maketrans({'.': 'G', '-': ' ', '_': ' '})
+
+
+def is_board_line(line):
+    """True for a row of a level (as opposed to a title, comment or
+    blank separator line)."""
+    line = line.rstrip('\r\n')
+    return bool(line.strip()) and '#' in line and set(line) <= XSB_CELLS
+
+
+def parse_xsb(lines, check=True):
+    """One level's XSB rows -> level map in the solvers' notation.
+
+    Trailing whitespace is dropped; rows keep their own lengths (short
+    rows are padded with walls by PackedLevel).  check=True runs
+    check_level() on the result.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    level_map = [line.rstrip().translate(TRANSLATE) for line in lines if line.strip()]
+    if check:
+        check_level(level_map)
+    return level_map
+
+
+def check_level(level_map):
+    """Raise ValueError unless level_map has one player and at least as
+    many goals as (one or more) boxes."""
+    if not level_map:
+        raise ValueError("no level rows")
+    counts = {char: sum(row.count(char) for row in level_map) for char in '@+$*G'}
+    if counts['@'] + counts['+'] != 1:
+        raise ValueError("a level needs exactly one player")
+    boxes = counts['$'] + counts['*']
+    goals = counts['G'] + counts['+'] + counts['*']
+    if boxes == 0 or boxes > goals:
+        raise ValueError(f"{boxes} boxes for {goals} goals")
+
+
+def iter_levels(path):
+    """Yield (name, level_map) for every level in a collection file.
+
+    The name comes from a "Title:" line following the level or, failing
+    that, the last ';' comment before it; otherwise it is the level's
+    1-based position in the file.  Levels are not checked, so one broken
+    level does not end the stream; see check_level().
+    """
+    number = 0
+    comment = None
+    board = []
+    pending = None
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if is_board_line(line):
+                if not board:
+                    # A new level starts; the previous one cannot get a
+                    # title any more.
+                    if pending is not None:
+                        yield level_entry(*pending)
+                        pending = None
+                    number += 1
+                    board_comment, comment = comment, None
+                board.append(line)
+                continue
+
+            if board:
+                pending = [number, board_comment, None, board]
+                board = []
+            if line.startswith(';'):
+                comment = line[1:].strip() or comment
+            elif line.lower().startswith('title:'):
+                title = line.split(':', 1)[1].strip()
+                if pending is not None:
+                    pending[2] = title or None
+                else:
+                    comment = title or comment
+
+    if board:
+        pending = [number, board_comment, None, board]
+    if pending is not None:
+        yield level_entry(*pending)
+
+
+def level_entry(number, comment, title, board):
+    return title or comment or str(number), parse_xsb(board, check=False)
+
+
+def load_level(path, which=1):
+    """One level from a collection, by 1-based position or by name."""
+    for number, (name, level_map) in enumerate(iter_levels(path), 1):
+        if which == number or which == name:
+            check_level(level_map)
+            return level_map
+    raise KeyError(f"no level {which!r} in {path}")
@@ -0,0 +1,208 @@
+"""Level-synchronous BFS with the state space split across processes.
+
+Every state belongs to exactly one shard, chosen by its Zobrist hash
+(hash % shards), and each shard's visited table lives only in its own
+worker process.  One round per BFS layer:
+
+    coordinator -> worker i : candidates owned by shard i
+    worker i                : drops the ones it has already seen, checks
+                              the rest for a solution and expands them
+    worker i -> coordinator : the successors, bucketed by owning shard
+
+The coordinator only regroups the buckets for the next round, so the
+dedup and expansion work runs on every core.  Because all shards finish
+a layer before the next one starts, the first solved state found is at
+the shallowest depth and the path is as short as BFS.py's.  Parents are
+stored as keys in the owning shard and the path is traced back through
+the workers once a solution is found.
+"""
+import multiprocessing
+import os
+from functools import partial
+
+from deadlocks import dead_squares, freeze_detector
+from search_core import CANCEL_CHECK_EVERY, interrupted, logger, record, record_stop
+from state_engine import PackedLevel, as_level
+
+LEVEL_MAP = [
+    "#######",
+    "#@.$ G#",
+    "#.#.#.#",
+    "#.$ G #",
+    "#######"
+]
+
+MOVES = {
+    'Up': (-1, 0),
+    'Down': (1, 0),
+    'Left': (0, -1),
+    'Right': (0, 1)
+}
+
+
+def shard_worker(level_map, index, shards, push_level, prune_dead, detect_freeze, conn):
+    """Process target owning shard index of shards; serves requests from
+    the coordinator over conn until told to stop."""
+    engine = PackedLevel(level_map)
+    dead = dead_squares(engine) if prune_dead else None
+    detector = freeze_detector(engine) if detect_freeze else None
+    if push_level:
+        expand = partial(engine.push_successors, dead=dead)
+    else:
+        expand = partial(engine.successors, dead=dead)
+    zobrist_move = engine.zobrist_move
+
+    # key -> (parent key, move); the start state's parent is None.
+    parents = {}
+
+    while True:
+        request = conn.recv()
+        kind = request[0]
+
+        if kind == 'layer':
+            frontier = []
+            solved = None
+            for key, h, parent, move, pushed_to in request[1]:
+                if key in parents:
+                    continue
+                parents[key] = (parent, move)
+                if pushed_to >= 0 and detector is not None and detector.is_deadlocked(key, pushed_to):
+                    continue
+                frontier.append((key, h))
+                if solved is None and engine.is_solved(key):
+                    solved = key
+            if solved is not None:
+                conn.send(('solved', solved, len(frontier)))
+                continue
+
+            outgoing = [[] for _ in range(shards)]
+            for key, h in frontier:
+                for move, next_key, pushed_to in expand(key):
+                    next_h = zobrist_move(h, key, next_key, pushed_to)
+                    owner = next_h % shards
+                    # Our own duplicates never need the round trip.
+                    if owner == index and next_key in parents:
+                        continue
+                    outgoing[owner].append((next_key, next_h, key, move, pushed_to))
+            conn.send(('expanded', outgoing, len(frontier)))
+
+        elif kind == 'parent':
+            conn.send(parents[request[1]])
+
+        elif kind == 'stop':
+            conn.close()
+            return
+
+
+def solve_sokoban_parallel_bfs(level_map, workers=None, push_level=False, prune_dead=True,
+                               detect_freeze=True, cancel=None, quiet=False, stats=None,
+                               probe=None):
+    """BFS over workers processes (default: one per core); same options
+    and result as BFS.solve_sokoban_bfs().  Each layer goes to the workers
+    in chunks of CANCEL_CHECK_EVERY states per worker and cancel is
+    checked between chunks; probe is looked at once per layer."""
+    shards = workers or os.cpu_count() or 1
+    engine = as_level(level_map)
+    level_map = engine.level_map
+    log = logger(quiet)
+    move_names = list(MOVES)
+    start_key = engine.normalize(engine.start_key) if push_level else engine.start_key
+
+    pipes = []
+    processes = []
+    for index in range(shards):
+        parent_end, child_end = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=shard_worker,
+            args=(level_map, index, shards, push_level, prune_dead, detect_freeze, child_end),
+            daemon=True
+        )
+        process.start()
+        child_end.close()
+        pipes.append(parent_end)
+        processes.append(process)
+
+    try:
+        start_hash = engine.zobrist(start_key)
+        incoming = [[] for _ in range(shards)]
+        incoming[start_hash % shards].append((start_key, start_hash, None, 0, -1))
+        nodes_explored = 0
+        depth = 0
+
+        while any(incoming):
+            outgoing = [[] for _ in range(shards)]
+            solved = None
+            # A worker's parents table is kept across requests, so a
+            # layer can be sent in chunks with the same result.
+            for start in range(0, max(len(batch) for batch in incoming), CANCEL_CHECK_EVERY):
+                for conn, batch in zip(pipes, incoming):
+                    conn.send(('layer', batch[start:start + CANCEL_CHECK_EVERY]))
+                replies = [conn.recv() for conn in pipes]
+                nodes_explored += sum(reply[2] for reply in replies)
+
+                solved = [reply[1] for reply in replies if reply[0] == 'solved']
+                if solved:
+                    break
+                for reply in replies:
+                    for owner, batch in enumerate(reply[1]):
+                        outgoing[owner].extend(batch)
+                if cancel is not None and interrupted(cancel, nodes_explored):
+                    log(" Search cancelled.")
+                    record(stats, nodes_expanded=nodes_explored, workers=shards)
+                    record_stop(stats, cancel)
+                    return None
+
+            if solved:
+                path = trace_path(engine, pipes, solved[0])
+                if push_level:
+                    pushes = len(path)
+                    path = engine.expand_pushes(engine.start_key, path)
+                    log(f" Solution found ({pushes} pushes, {len(path)} moves).")
+                else:
+                    log(f" Solution found (Shortest path: {len(path)} moves, depth {depth}).")
+                log(f" Nodes Explored: {nodes_explored} across {shards} workers")
+                record(stats, nodes_expanded=nodes_explored, workers=shards)
+                return [move_names[move] for move in path]
+
+            incoming = outgoing
+            depth += 1
+            if probe is not None and probe.due(nodes_explored):
+                probe.snapshot(nodes_expanded=nodes_explored, depth=depth,
+                               frontier=sum(len(batch) for batch in incoming))
+
+        log(" Puzzle is unsolvable or too deep for current search scope.")
+        log(f"Nodes Explored: {nodes_explored}")
+        record(stats, nodes_expanded=nodes_explored, workers=shards)
+        return None
+    finally:
+        for conn in pipes:
+            conn.send(('stop',))
+            conn.close()
+        for process in processes:
+            process.join()
+
+
+def trace_path(engine, pipes, key):
+    """Moves from the start to key, asking each state's owning shard for
+    its parent in turn."""
+    shards = len(pipes)
+    path = []
+    while True:
+        conn = pipes[engine.zobrist(key) % shards]
+        conn.send(('parent', key))
+        parent, move = conn.recv()
+        if parent is None:
+            break
+        path.append(move)
+        key = parent
+    path.reverse()
+    return path
+
+
+if __name__ == "__main__":
+    print("... Starting parallel BFS search ...")
+    solution = solve_sokoban_parallel_bfs(LEVEL_MAP)
+
+    if solution:
+        print("\nSolution Move Sequence:")
+        print(" -> ".join(solution))
@@ -0,0 +1,216 @@
+"""Race several solver configurations on one level.
+
+Every configuration runs in its own process.  solve_portfolio() returns
+the first solution that arrives or, given a deadline, the shortest one
+received before it; either way the remaining solvers are told to stop
+through a shared cancel Event (see search_core.cancelled) and are
+terminated if they have not exited after GRACE_PERIOD seconds.
+"""
+import contextlib
+import importlib.util
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from search_core import logger
+from state_engine import as_level
+
+LEVEL_MAP = [
+    "#######",
+    "#@.$ G#",
+    "#.#.#.#",
+    "#.$ G #",
+    "#######"
+]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (script, function, extra keyword arguments).  Every function
+# takes the level as its first argument and a cancel= token.
+SOLVERS = {
+    'bfs': ('BFS.py', 'solve_sokoban_bfs', {}),
+    'bfs-push': ('BFS.py', 'solve_sokoban_bfs', {'push_level': True}),
+    'ucs': ('UCS.py', 'solve_sokoban_ucs', {}),
+    'astar': ('Astarr.py', 'solve_sokoban_astar', {}),
+    'astar-push': ('Astarr.py', 'solve_sokoban_astar', {'push_level': True}),
+    'bidirectional': ('bidirectional.py', 'solve_sokoban_bidirectional', {}),
+    'dfs': ('DFS.py', 'solve_sokoban_creative', {}),
+    'ids': ('(IDS)AI_Project.py', 'iterative_deepening_search', {}),
+    'ida-push': ('(IDS)AI_Project.py', 'ida_star_search', {'push_level': True}),
+    'hill-climbing': ('SOKOBAN_Hill_Climbing.py', 'solve_sokoban_hill_climbing', {}),
+    'ga': ('GA.py', 'solve_sokoban_ga', {}),
+}
+
+# Configurations whose solutions have the fewest moves possible (the
+# push-level ones minimise pushes instead).
+OPTIMAL_SOLVERS = ('bfs', 'ucs', 'astar', 'ids')
+
+DEFAULT_PORTFOLIO = ('astar-push', 'bfs-push', 'ida-push', 'astar', 'dfs',
+                     'hill-climbing', 'ga')
+
+GRACE_PERIOD = 2.0
+
+# Seconds solve_portfolio() waits on the results queue before checking
+# whether a solver process died without reporting.
+POLL = 1.0
+
+# Solvers name their moves either 'Up' or 'U'; results are reported with
+# the long names.
+MOVE_NAMES = ('Up', 'Down', 'Left', 'Right')
+MOVE_INDEX = {'Up': 0, 'Down': 1, 'Left': 2, 'Right': 3,
+              'U': 0, 'D': 1, 'L': 2, 'R': 3}
+
+# LURD notation: the letter of each direction index, upper case for a
+# push.
+LURD = 'udlr'
+
+
+def load_solver(script, function):
+    """Import a solver script by file name (the IDS script's name is not
+    a valid module name) and return its solve function."""
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    name = ''.join(ch if ch.isalnum() else '_' for ch in os.path.splitext(script)[0])
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, script))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return getattr(module, function)
+
+
+def run_solver(name, level_map, cancel, results, quiet=True):
+    """Process target: run one configuration and put
+    (name, moves or None, seconds, error or None) on results."""
+    script, function, kwargs = SOLVERS[name]
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as sink:
+            with contextlib.redirect_stdout(sink if quiet else sys.stdout):
+                solve = load_solver(script, function)
+                solution = solve(level_map, cancel=cancel, **kwargs)
+    except Exception as error:
+        results.put((name, None, time.perf_counter() - start, repr(error)))
+        return
+    results.put((name, solution, time.perf_counter() - start, None))
+
+
+def replay(engine, key, directions):
+    """(final key, [(key, direction, pushed)] for each step) for
+    directions played from key, or None when one of them is not a legal
+    move."""
+    steps = []
+    for direction in directions:
+        for move, next_key, pushed_to in engine.successors(key):
+            if move == direction:
+                steps.append((key, direction, pushed_to >= 0))
+                key = next_key
+                break
+        else:
+            return None
+    return key, steps
+
+
+def lurd(level_map, moves):
+    """moves (move names, 'Up' or 'U' style) as a LURD string, or None
+    when they are not legal or do not solve the level.  level_map may
+    also be a PackedLevel."""
+    engine = as_level(level_map)
+    replayed = replay(engine, engine.start_key, [MOVE_INDEX[name] for name in moves])
+    if replayed is None or not engine.is_solved(replayed[0]):
+        return None
+    return ''.join(LURD[direction].upper() if pushed else LURD[direction]
+                   for _, direction, pushed in replayed[1])
+
+
+def check_solution(level_map, moves):
+    """Replay moves on level_map; True if they are legal and solve it."""
+    return lurd(level_map, moves) is not None
+
+
+def solve_portfolio(level_map, solvers=DEFAULT_PORTFOLIO, deadline=None, quiet=True):
+    """Run the named SOLVERS configurations in parallel on level_map.
+
+    Without a deadline the first valid solution wins; with one (seconds)
+    the shortest valid solution received before it wins.  Returns
+    (name, moves), or (None, None) when no solver succeeded.  A solver
+    whose process dies without reporting (killed, out of memory) counts
+    as failed.  quiet=False shows the solvers' output and a line per
+    finished solver.
+    """
+    log = logger(quiet)
+    cancel = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=run_solver,
+                                args=(name, level_map, cancel, results, quiet),
+                                daemon=True)
+        for name in solvers
+    ]
+    for worker in workers:
+        worker.start()
+
+    best_name, best_moves = None, None
+    stop_at = None if deadline is None else time.monotonic() + deadline
+    reported = set()
+    failed = set()
+
+    while len(reported) + len(failed) < len(workers):
+        timeout = POLL
+        if stop_at is not None:
+            left = stop_at - time.monotonic()
+            if left <= 0:
+                break
+            timeout = min(POLL, left)
+        try:
+            name, solution, seconds, error = results.get(timeout=timeout)
+        except queue.Empty:
+            # A solver that finished has reported before exiting, so a
+            # non-zero exit code without a result means it died.
+            for name, worker in zip(solvers, workers):
+                if (name not in reported and name not in failed
+                        and worker.exitcode not in (None, 0)):
+                    failed.add(name)
+                    log(f"  {name}: died (exit code {worker.exitcode})")
+            continue
+        reported.add(name)
+
+        if error is not None:
+            log(f"  {name}: failed with {error}")
+            continue
+        if solution is None:
+            log(f"  {name}: no solution ({seconds:.2f}s)")
+            continue
+        moves = [MOVE_NAMES[MOVE_INDEX[move]] for move in solution]
+        if not check_solution(level_map, moves):
+            log(f"  {name}: returned an invalid solution")
+            continue
+        log(f"  {name}: {len(moves)} moves in {seconds:.2f}s")
+        if best_moves is None or len(moves) < len(best_moves):
+            best_name, best_moves = name, moves
+        if deadline is None:
+            break
+
+    cancel.set()
+    for worker in workers:
+        worker.join(GRACE_PERIOD)
+    for worker in workers:
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+
+    return best_name, best_moves
+
+
+if __name__ == "__main__":
+    print("... Starting solver portfolio ...")
+    winner, solution = solve_portfolio(LEVEL_MAP)
+
+    if solution is None:
+        print("No solver found a solution")
+    else:
+        print(f"\nWinner: {winner} ({len(solution)} moves)")
+        print(" -> ".join(solution))
@@ -0,0 +1,134 @@
+"""Array-backed search tree shared by the graph-search solvers.
+
+Frontier entries used to carry their whole move list (path + [move]),
+an O(depth) copy per generated node.  Instead every generated node gets
+an index in a NodeTable that stores only its packed key, its parent's
+index and the move that reached it; the move list is rebuilt once, by
+walking parent pointers, when the goal is found.
+"""
+from array import array
+
+ROOT = -1
+
+
+class NodeTable:
+    """Parallel arrays of (key, parent index, move) for generated nodes.
+
+    Step moves are direction indices and fit in a byte ('B'); push-level
+    moves (box_cell * 4 + direction) need a wider type code such as 'I'.
+    """
+
+    def __init__(self, move_typecode='B'):
+        self.keys = []
+        self.parents = array('i')
+        self.moves = array(move_typecode)
+
+    def add(self, key, parent=ROOT, move=0):
+        self.keys.append(key)
+        self.parents.append(parent)
+        self.moves.append(move)
+        return len(self.keys) - 1
+
+    def path(self, node):
+        """Moves from the root to node."""
+        parents = self.parents
+        moves = self.moves
+        path = []
+        while parents[node] != ROOT:
+            path.append(moves[node])
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# Solvers take an optional cancel token (any object with is_set(), e.g.
+# a threading or multiprocessing Event) and poll it once every
+# CANCEL_CHECK_EVERY expansions, so a portfolio run can stop the losers.
+CANCEL_CHECK_EVERY = 1024
+
+
+def cancelled(cancel, count):
+    """True when cancel is set; only looked at every CANCEL_CHECK_EVERY
+    counts to keep the check off the hot path."""
+    return (cancel is not None and count % CANCEL_CHECK_EVERY == 0
+            and interrupted(cancel, count))
+
+
+def interrupted(cancel, count):
+    """cancel.is_set(), after charging count expansions to cancel when
+    it is a budget.Budget."""
+    charge = getattr(cancel, 'charge', None)
+    if charge is not None:
+        charge(count)
+    return cancel.is_set()
+
+
+def stop_reason(cancel):
+    """Why a solver was stopped through its cancel token: a Budget's
+    reason ('time', 'nodes', 'memory') or 'cancelled'."""
+    return getattr(cancel, 'reason', None) or 'cancelled'
+
+
+def closest_node(engine, nodes):
+    """(index, boxes_left) of the first node in a NodeTable with the
+    fewest boxes off the goals -- for BFS also the shallowest."""
+    best, best_left = 0, None
+    for index, key in enumerate(nodes.keys):
+        left = engine.boxes_left(key)
+        if best_left is None or left < best_left:
+            best, best_left = index, left
+            if left == 0:
+                break
+    return best, best_left
+
+
+def partial_result(engine, nodes, move_names, push_level=False):
+    """stats entries for a search stopped early: the moves to its
+    closest_node() ('partial') and that state's 'boxes_left'."""
+    node, left = closest_node(engine, nodes)
+    path = nodes.path(node)
+    if push_level:
+        path = engine.expand_pushes(engine.start_key, path)
+    return {'partial': [move_names[move] for move in path], 'boxes_left': left}
+
+
+# The keywords every solver in portfolio.SOLVERS takes after the level
+# (a level map or a PackedLevel); solver docstrings only note where
+# they differ:
+#
+#   cancel  token polled through cancelled()/interrupted(); a
+#           budget.Budget also bounds time, expansions and memory.
+#   quiet   True silences the progress and result output (logger()).
+#   stats   a dict filled with the counters (record()), such as
+#           nodes_expanded, and after a stop with 'stopped' and, where
+#           the solver can tell, 'partial' and 'boxes_left'
+#           (record_stop()).
+#   probe   an instrumentation.Probe that gets periodic snapshots of the
+#           same counters.
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def logger(quiet):
+    """The print function a solver uses: print, or a no-op when quiet."""
+    return _silent if quiet else print
+
+
+def record(stats, **values):
+    """Copy values into the caller's stats dict, if one was passed."""
+    if stats is not None:
+        stats.update(values)
+
+
+def record_stop(stats, cancel, engine=None, nodes=None, move_names=None, push_level=False):
+    """Record in stats (if given) why the search stopped and, when its
+    NodeTable is passed, the partial_result() as well."""
+    if stats is None:
+        return
+    stats['stopped'] = stop_reason(cancel)
+    if nodes is not None:
+        stats.update(partial_result(engine, nodes, move_names, push_level))
@@ -0,0 +1,23 @@
+"""Library interface to the solvers.
+
+    import sokoban
+
+    level = sokoban.Level(["#####", "#@$G#", "#####"])
+    result = sokoban.solve(level, sokoban.Limits(time=10), algorithm='astar-push')
+    if result.solved:
+        print(result.moves, result.stats['nodes_expanded'])
+
+Importing the package runs no search and loads no solver script; each
+algorithm's script is imported the first time it is used.  A Level (a
+PackedLevel of state_engine.py, checked with levels.check_level so a
+malformed map raises ValueError) holds the walls, goals and neighbour
+tables, and the deadlock tables computed for it are cached on it, so a
+worker solving a level more than once builds them only once.  Across
+runs, solve(..., cache=SolutionCache(path)) answers levels already
+solved (in any rotation or reflection) from an SQLite file.
+"""
+from .api import (ALGORITHMS, DEFAULT_ALGORITHM, Budget, Level, Limits, Result,
+                  SolutionCache, make_level, solve, solver)
+
+__all__ = ['ALGORITHMS', 'DEFAULT_ALGORITHM', 'Budget', 'Level', 'Limits', 'Result',
+           'SolutionCache', 'make_level', 'solve', 'solver']
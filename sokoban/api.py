@@ -0,0 +1,143 @@
+"""solve(level, limits) -> Result over the configurations of
+portfolio.SOLVERS."""
+import time
+from collections import namedtuple
+from functools import partial
+
+from budget import Budget
+from levels import check_level, parse_xsb
+from portfolio import MOVE_INDEX, MOVE_NAMES, OPTIMAL_SOLVERS, SOLVERS, load_solver
+from solution_cache import SolutionCache
+from state_engine import PackedLevel
+
+
+class Level(PackedLevel):
+    """A PackedLevel built from a level map in the solvers' notation (a
+    list of rows), checked first: raises ValueError for a malformed
+    level (see levels.check_level)."""
+
+    def __init__(self, level_map):
+        level_map = list(level_map)
+        check_level(level_map)
+        super().__init__(level_map)
+
+
+ALGORITHMS = tuple(SOLVERS)
+DEFAULT_ALGORITHM = 'astar-push'
+
+
+# Result.status for each budget.Budget stop reason.
+STOP_STATUS = {'time': 'timeout', 'nodes': 'node-limit', 'memory': 'memory-limit',
+               'cancelled': 'cancelled'}
+
+
+class Limits:
+    """What one solve() call may spend: time in seconds, nodes
+    (expansions), memory (process RSS in bytes), each None for no limit,
+    and an optional cancel token of the caller's (anything with
+    is_set()).  See budget.py for how they are checked."""
+
+    def __init__(self, time=None, nodes=None, memory=None, cancel=None):
+        self.time = time
+        self.nodes = nodes
+        self.memory = memory
+        self.cancel = cancel
+
+
+class Result(namedtuple('Result', 'algorithm status moves seconds stats')):
+    """Outcome of solve().
+
+    status is 'solved', 'unsolved' (the search ended without a
+    solution), 'timeout', 'node-limit', 'memory-limit' or 'cancelled';
+    moves is the list of move names ('Up', ...) when solved, else None;
+    stats holds the solver's counters, such as nodes_expanded.
+    """
+    __slots__ = ()
+
+    @property
+    def solved(self):
+        return self.status == 'solved'
+
+    @property
+    def partial(self):
+        """Moves to the best state reached by a stopped search (the
+        state itself has stats['boxes_left'] boxes off the goals), or
+        None if the solver could not tell."""
+        return self.stats.get('partial')
+
+
+def make_level(level):
+    """Level from a Level or PackedLevel (returned as it is), a level
+    map in the solvers' notation (a list of rows) or XSB text (one
+    string, see levels.py).  Raises ValueError for a malformed level."""
+    if isinstance(level, PackedLevel):
+        return level
+    if isinstance(level, str):
+        level = parse_xsb(level, check=False)
+    return Level(level)
+
+
+def solve(level, limits=None, algorithm=DEFAULT_ALGORITHM, probe=None, cache=None):
+    """Run one of ALGORITHMS on level without printing anything.
+
+    probe, an instrumentation.Probe, receives the solver's periodic
+    snapshots and a final event with the status and the stats.
+
+    cache, a solution_cache.SolutionCache, is looked up first and a
+    solution found by the search is saved to it.  A stored solution is
+    returned without searching (stats then has 'cached': True and the
+    stored stats, 'solved_by' and 'optimal'), unless the algorithm is
+    one of OPTIMAL_SOLVERS and the stored solution is not optimal.
+
+    'ga' keeps its level in module globals, so it must not run in two
+    threads at once; the search algorithms share no state between calls.
+    """
+    if algorithm not in SOLVERS:
+        raise ValueError(f"unknown algorithm: {algorithm!r}")
+    level = make_level(level)
+    limits = limits or Limits()
+    script, function, kwargs = SOLVERS[algorithm]
+    run = load_solver(script, function)
+
+    if cache is not None:
+        start = time.perf_counter()
+        hit = cache.lookup(level)
+        if hit is not None and (hit.optimal or algorithm not in OPTIMAL_SOLVERS):
+            seconds = time.perf_counter() - start
+            stats = dict(hit.stats, cached=True, solved_by=hit.algorithm, optimal=hit.optimal)
+            if probe is not None:
+                probe.finish('solved', seconds=round(seconds, 6), **stats)
+            return Result(algorithm, 'solved', hit.moves, seconds, stats)
+
+    token = Budget(limits.time, limits.nodes, limits.memory, limits.cancel)
+    stats = {}
+    start = time.perf_counter()
+    moves = run(level, cancel=token, quiet=True, stats=stats, probe=probe, **kwargs)
+    seconds = time.perf_counter() - start
+
+    if stats.get('partial') is not None:
+        stats['partial'] = [MOVE_NAMES[MOVE_INDEX[move]] for move in stats['partial']]
+    if moves is not None:
+        moves = [MOVE_NAMES[MOVE_INDEX[move]] for move in moves]
+        status = 'solved'
+    elif 'stopped' in stats:
+        # The reason the solver stopped on; the limits are not looked at
+        # again, since one may have run out after the search ended.
+        status = STOP_STATUS[stats['stopped']]
+    else:
+        status = 'unsolved'
+    if cache is not None and moves is not None:
+        try:
+            cache.store(level, moves, algorithm, algorithm in OPTIMAL_SOLVERS, stats)
+        except ValueError:
+            pass  # not a solution after all; the caller sees the moves as they are
+    if probe is not None:
+        probe.finish(status, seconds=round(seconds, 6), **stats)
+    return Result(algorithm, status, moves, seconds, stats)
+
+
+def solver(algorithm):
+    """solve() bound to one algorithm: a function (level, limits=None)."""
+    if algorithm not in SOLVERS:
+        raise ValueError(f"unknown algorithm: {algorithm!r}")
+    return partial(solve, algorithm=algorithm)
@@ -0,0 +1,244 @@
+"""Persistent store of solved levels (SQLite).
+
+    cache = SolutionCache('solutions.sqlite')
+    hit = cache.lookup(level)          # CachedSolution or None
+    if hit is None:
+        moves = solve(level)
+        cache.store(level, moves, 'astar', optimal=True)
+
+Levels are keyed by fingerprint(): a hash of their canonical text, the
+level redrawn with only what matters to a solver -- the cells the player
+could ever walk on (boxes ignored), the goals, the boxes and the player
+moved to the first cell of its region (as PackedLevel.normalize() does).
+Walls and floor the player can never reach are dropped, and of the 8
+rotations/reflections of that drawing the smallest text is used, so a
+level and its mirror images share one entry.
+
+Solutions are stored in LURD notation (pushes in upper case) in the
+canonical orientation, with the cell the player started from.  lookup()
+turns them back into the caller's orientation; when the caller's player
+starts elsewhere in the same region, the stored pushes are replayed
+from there (PackedLevel.expand_pushes), which gives a valid solution but
+not necessarily an optimal one.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from collections import namedtuple
+
+from portfolio import LURD, MOVE_INDEX, MOVE_NAMES, replay
+from state_engine import DIRECTIONS, as_level
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    fingerprint TEXT PRIMARY KEY,
+    level TEXT NOT NULL,
+    start_row INTEGER NOT NULL,
+    start_col INTEGER NOT NULL,
+    solution TEXT NOT NULL,
+    algorithm TEXT,
+    optimal INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    pushes INTEGER NOT NULL,
+    stats TEXT,
+    saved REAL NOT NULL
+)
+"""
+
+# The 8 symmetries of a rows x cols grid: (r, c) -> new (r, c).  1-3
+# rotate by 90, 180 and 270 degrees clockwise, 4 and 5 mirror left-right
+# and top-bottom, 6 and 7 reflect about the two diagonals; 1, 3, 6 and
+# 7 swap rows and cols (SWAPS_AXES).
+SYMMETRIES = (
+    lambda r, c, rows, cols: (r, c),
+    lambda r, c, rows, cols: (c, rows - 1 - r),
+    lambda r, c, rows, cols: (rows - 1 - r, cols - 1 - c),
+    lambda r, c, rows, cols: (cols - 1 - c, r),
+    lambda r, c, rows, cols: (r, cols - 1 - c),
+    lambda r, c, rows, cols: (rows - 1 - r, c),
+    lambda r, c, rows, cols: (c, r),
+    lambda r, c, rows, cols: (cols - 1 - c, rows - 1 - r),
+)
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+SWAPS_AXES = (False, True, False, True, False, False, True, True)
+
+
+def _direction_map(transform):
+    origin = transform(1, 1, 3, 3)
+    mapped = []
+    for dr, dc in DIRECTIONS:
+        r, c = transform(1 + dr, 1 + dc, 3, 3)
+        mapped.append(DIRECTIONS.index((r - origin[0], c - origin[1])))
+    return tuple(mapped)
+
+
+# DIRECTION_MAP[s][d]: where direction d points after symmetry s.
+DIRECTION_MAP = tuple(_direction_map(transform) for transform in SYMMETRIES)
+
+
+class CachedSolution(namedtuple('CachedSolution', 'moves algorithm optimal stats')):
+    """A stored solution in the caller's orientation: moves are move
+    names ('Up', ...); optimal is True only when the stored solution was
+    move-optimal and is returned as it was stored."""
+    __slots__ = ()
+
+
+class Canonical:
+    """The canonical drawing of a level and the way back to it.
+
+    text is the drawing; symmetry, (top, left) and (rows, cols) say how
+    a cell of the original map becomes a cell of the drawing: shift by
+    the crop origin, then apply SYMMETRIES[symmetry].
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        key = engine.start_key
+        boxes = engine.boxes_of(key)
+
+        # Cells the player could walk on if no box were in the way; the
+        # other floor cells are never entered, so only their boxes and
+        # goals are kept.
+        start = engine.player_of(key)
+        interior = {start}
+        stack = [start]
+        while stack:
+            cell = stack.pop()
+            for nxt in engine.neighbours[cell]:
+                if nxt >= 0 and nxt not in interior:
+                    interior.add(nxt)
+                    stack.append(nxt)
+        kept = interior | set(engine.box_cells(key)) | set(engine.goal_cells)
+        region = engine.reachable(key)[0]
+
+        positions = [engine.position(cell) for cell in kept]
+        self.top = min(r for r, c in positions)
+        self.left = min(c for r, c in positions)
+        self.rows = max(r for r, c in positions) - self.top + 1
+        self.cols = max(c for r, c in positions) - self.left + 1
+
+        best = None
+        for symmetry, transform in enumerate(SYMMETRIES):
+            rows, cols = ((self.cols, self.rows) if SWAPS_AXES[symmetry]
+                          else (self.rows, self.cols))
+            grid = [['#'] * cols for _ in range(rows)]
+            player = None
+            for cell in kept:
+                r, c = engine.position(cell)
+                r, c = transform(r - self.top, c - self.left, self.rows, self.cols)
+                goal = (engine.goal_mask >> cell) & 1
+                if (boxes >> cell) & 1:
+                    grid[r][c] = '*' if goal else '$'
+                else:
+                    grid[r][c] = '.' if goal else ' '
+                if region[cell] and (player is None or (r, c) < player):
+                    player = (r, c)
+            r, c = player
+            grid[r][c] = '+' if grid[r][c] == '.' else '@'
+            text = '\n'.join(''.join(row) for row in grid)
+            if best is None or text < best:
+                best, self.symmetry = text, symmetry
+        self.text = best
+
+    def to_canonical(self, cell):
+        r, c = self.engine.position(cell)
+        return SYMMETRIES[self.symmetry](r - self.top, c - self.left, self.rows, self.cols)
+
+    def from_canonical(self, position):
+        rows, cols = ((self.cols, self.rows) if SWAPS_AXES[self.symmetry]
+                      else (self.rows, self.cols))
+        r, c = SYMMETRIES[INVERSE[self.symmetry]](position[0], position[1], rows, cols)
+        return self.engine.cell((r + self.top, c + self.left))
+
+    def fingerprint(self):
+        return hashlib.sha256(self.text.encode()).hexdigest()
+
+
+def fingerprint(level):
+    """Hex digest identifying level up to symmetry and player position
+    within its region (a PackedLevel or a level map)."""
+    return Canonical(as_level(level)).fingerprint()
+
+
+class SolutionCache:
+    """Solutions in an SQLite file at path (':memory:' for a throwaway
+    one), one entry per fingerprint()."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(SCHEMA)
+        self.db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def lookup(self, level):
+        """CachedSolution for level, or None if it was never stored (or
+        its stored pushes do not replay from the caller's start, which
+        counts as a miss too).  The moves are not otherwise checked
+        against the level; a corrupted entry can return moves that do
+        not solve it."""
+        engine = as_level(level)
+        canonical = Canonical(engine)
+        row = self.db.execute(
+            "SELECT level, start_row, start_col, solution, algorithm, optimal, stats "
+            "FROM solutions WHERE fingerprint = ?", (canonical.fingerprint(),)).fetchone()
+        if row is None or row[0] != canonical.text:
+            self.misses += 1
+            return None
+        text, start_row, start_col, solution, algorithm, optimal, stats = row
+
+        back = DIRECTION_MAP[INVERSE[canonical.symmetry]]
+        directions = [back[LURD.index(letter.lower())] for letter in solution]
+        start = canonical.from_canonical((start_row, start_col))
+        player = engine.player_of(engine.start_key)
+        if start != player:
+            # Same region, other start: keep the pushes, redo the walks.
+            key = engine.encode(start, engine.boxes_of(engine.start_key))
+            replayed = replay(engine, key, directions)
+            if replayed is None:
+                self.misses += 1
+                return None
+            pushes = [engine.neighbours[engine.player_of(key)][direction] * 4 + direction
+                      for key, direction, pushed in replayed[1] if pushed]
+            directions = engine.expand_pushes(engine.start_key, pushes)
+            optimal = False
+        self.hits += 1
+        return CachedSolution([MOVE_NAMES[d] for d in directions], algorithm,
+                              bool(optimal), json.loads(stats) if stats else {})
+
+    def store(self, level, moves, algorithm=None, optimal=False, stats=None):
+        """Save moves (move names, 'Up' or 'U' style) as the solution of
+        level.  An entry already stored is only replaced by an optimal
+        solution where it was not, or by a shorter one of the same kind.
+        Returns True if the solution was saved; raises ValueError if the
+        moves do not solve the level."""
+        engine = as_level(level)
+        replayed = replay(engine, engine.start_key, [MOVE_INDEX[move] for move in moves])
+        if replayed is None or not engine.is_solved(replayed[0]):
+            raise ValueError("moves do not solve the level")
+        canonical = Canonical(engine)
+        turn = DIRECTION_MAP[canonical.symmetry]
+        solution = ''.join(LURD[turn[d]].upper() if pushed else LURD[turn[d]]
+                           for key, d, pushed in replayed[1])
+        fingerprint = canonical.fingerprint()
+
+        row = self.db.execute("SELECT optimal, moves FROM solutions WHERE fingerprint = ?",
+                              (fingerprint,)).fetchone()
+        if row is not None and (bool(row[0]), -row[1]) >= (bool(optimal), -len(solution)):
+            return False
+        start_row, start_col = canonical.to_canonical(engine.player_of(engine.start_key))
+        self.db.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (fingerprint, canonical.text, start_row, start_col, solution, algorithm,
+             int(bool(optimal)), len(solution), sum(letter.isupper() for letter in solution),
+             json.dumps(stats, default=str) if stats else None, time.time()))
+        self.db.commit()
+        return True
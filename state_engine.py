@@ -0,0 +1,291 @@
+"""Compact state engine shared by the graph-search solvers.
+
+The grid is flattened to cell indices (r * cols + c) and a whole search
+state is packed into one Python int:
+
+    key = (box_bits << player_bits) | player_cell
+
+where bit i of box_bits is set when cell i holds a box.  A push only
+flips two box bits and swaps the player index, so successors are built
+without creating any set/frozenset, and the int itself is the dict/set
+key used by the visited tables.
+"""
+import random
+
+# Direction order matches the MOVES dicts in every solver script
+# (Up, Down, Left, Right), so a direction index can be mapped back to
+# the solver's own move names with list(MOVES)[d].  Opposite directions
+# differ only in the lowest bit: d ^ 1.
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+ZOBRIST_SEED = 0x5EED
+
+
+class PackedLevel:
+    """Static level data plus packed-state helpers for one LEVEL_MAP."""
+
+    def __init__(self, level_map):
+        self.level_map = level_map
+        self.rows = len(level_map)
+        self.cols = max(len(row) for row in level_map)
+        self.size = self.rows * self.cols
+        self.player_bits = max(1, (self.size - 1).bit_length())
+        self.player_mask = (1 << self.player_bits) - 1
+
+        self.walls = bytearray(self.size)
+        self.goal_cells = []
+        self.goal_mask = 0
+        start_boxes = 0
+        start_player = None
+
+        for r in range(self.rows):
+            for c in range(self.cols):
+                char = level_map[r][c] if c < len(level_map[r]) else '#'
+                cell = r * self.cols + c
+                if char == '#':
+                    self.walls[cell] = 1
+                    continue
+                # '*' is a box on a goal and '+' the player on a goal
+                # (XSB notation, see levels.py).
+                if char in 'G*+':
+                    self.goal_cells.append(cell)
+                    self.goal_mask |= 1 << cell
+                if char in '$*':
+                    start_boxes |= 1 << cell
+                elif char in '@+':
+                    start_player = cell
+
+        # neighbours[cell][d] is the cell reached by stepping in
+        # direction d, or -1 when that step leaves the map or hits a wall.
+        self.neighbours = []
+        for cell in range(self.size):
+            r, c = divmod(cell, self.cols)
+            steps = []
+            for dr, dc in DIRECTIONS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < self.rows and 0 <= nc < self.cols:
+                    nxt = nr * self.cols + nc
+                    steps.append(-1 if self.walls[nxt] else nxt)
+                else:
+                    steps.append(-1)
+            self.neighbours.append(tuple(steps))
+
+        self.start_key = self.encode(start_player, start_boxes)
+
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist_box = [rng.getrandbits(64) for _ in range(self.size)]
+        self.zobrist_player = [rng.getrandbits(64) for _ in range(self.size)]
+
+    # --- packing ---------------------------------------------------------
+
+    def encode(self, player_cell, box_bits):
+        return (box_bits << self.player_bits) | player_cell
+
+    def player_of(self, key):
+        return key & self.player_mask
+
+    def boxes_of(self, key):
+        return key >> self.player_bits
+
+    def cell(self, pos):
+        return pos[0] * self.cols + pos[1]
+
+    def position(self, cell):
+        return divmod(cell, self.cols)
+
+    def pack(self, state):
+        """(player_tuple, frozenset(box_tuples)) -> packed key."""
+        player, boxes = state
+        box_bits = 0
+        for box in boxes:
+            box_bits |= 1 << self.cell(box)
+        return self.encode(self.cell(player), box_bits)
+
+    def unpack(self, key):
+        """Packed key -> (player_tuple, frozenset(box_tuples))."""
+        return (self.position(self.player_of(key)),
+                frozenset(self.box_positions(key)))
+
+    def box_cells(self, key):
+        boxes = key >> self.player_bits
+        cells = []
+        while boxes:
+            low = boxes & -boxes
+            cells.append(low.bit_length() - 1)
+            boxes ^= low
+        return cells
+
+    def box_positions(self, key):
+        cols = self.cols
+        return [divmod(cell, cols) for cell in self.box_cells(key)]
+
+    def is_solved(self, key):
+        """All boxes are on goal cells."""
+        return (key >> self.player_bits) & ~self.goal_mask == 0
+
+    def boxes_left(self, key):
+        """Number of boxes not on a goal cell."""
+        return bin((key >> self.player_bits) & ~self.goal_mask).count('1')
+
+    # --- successors ------------------------------------------------------
+
+    def successors(self, key, dead=None):
+        """Yield (direction, next_key, pushed_to) for every legal step.
+
+        pushed_to is the cell the box was pushed onto, or -1 for a plain
+        walk.  When a dead-square table is given (see deadlocks.py),
+        pushes onto dead cells are skipped.
+        """
+        pb = self.player_bits
+        player = key & self.player_mask
+        boxes = key >> pb
+        neighbours = self.neighbours
+        steps = neighbours[player]
+
+        for d in range(4):
+            nxt = steps[d]
+            if nxt < 0:
+                continue
+            bit = 1 << nxt
+            if not boxes & bit:
+                yield d, (boxes << pb) | nxt, -1
+                continue
+            beyond = neighbours[nxt][d]
+            if beyond < 0 or (boxes >> beyond) & 1:
+                continue
+            if dead is not None and dead[beyond]:
+                continue
+            yield d, ((boxes ^ bit ^ (1 << beyond)) << pb) | nxt, beyond
+
+    # --- push-level (macro-move) successors ------------------------------
+
+    def reachable(self, key):
+        """Flood-fill the player's region.
+
+        Returns (seen, min_cell) where seen[cell] is 1 for every cell the
+        player can walk to without pushing.
+        """
+        boxes = key >> self.player_bits
+        neighbours = self.neighbours
+        start = key & self.player_mask
+        seen = bytearray(self.size)
+        seen[start] = 1
+        stack = [start]
+        min_cell = start
+        while stack:
+            cell = stack.pop()
+            if cell < min_cell:
+                min_cell = cell
+            for nxt in neighbours[cell]:
+                if nxt >= 0 and not seen[nxt] and not (boxes >> nxt) & 1:
+                    seen[nxt] = 1
+                    stack.append(nxt)
+        return seen, min_cell
+
+    def normalize(self, key):
+        """Move the player to the smallest cell of its reachable region.
+
+        Two states that differ only in where the player stands inside the
+        same region map to the same normalized key.
+        """
+        return self.encode(self.reachable(key)[1], key >> self.player_bits)
+
+    def push_successors(self, key, dead=None):
+        """Yield (push, next_key, pushed_to) for every legal box push.
+
+        push encodes the move as box_cell * 4 + direction so it can be
+        replayed with expand_pushes(); next_key is already normalized.
+        """
+        pb = self.player_bits
+        boxes = key >> pb
+        seen = self.reachable(key)[0]
+        neighbours = self.neighbours
+
+        for box in self.box_cells(key):
+            steps = neighbours[box]
+            for d in range(4):
+                behind = steps[d ^ 1]
+                if behind < 0 or not seen[behind]:
+                    continue
+                beyond = steps[d]
+                if beyond < 0 or (boxes >> beyond) & 1:
+                    continue
+                if dead is not None and dead[beyond]:
+                    continue
+                moved = boxes ^ (1 << box) ^ (1 << beyond)
+                yield (box * 4 + d,
+                       self.normalize((moved << pb) | box),
+                       beyond)
+
+    def walk(self, key, target):
+        """Shortest list of directions taking the player to target without
+        pushing, or None when target is not reachable."""
+        boxes = key >> self.player_bits
+        neighbours = self.neighbours
+        start = key & self.player_mask
+        if start == target:
+            return []
+        parent = {start: None}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for cell in frontier:
+                for d, nxt in enumerate(neighbours[cell]):
+                    if nxt < 0 or nxt in parent or (boxes >> nxt) & 1:
+                        continue
+                    parent[nxt] = (cell, d)
+                    if nxt == target:
+                        moves = []
+                        while parent[nxt] is not None:
+                            nxt, d = parent[nxt]
+                            moves.append(d)
+                        moves.reverse()
+                        return moves
+                    next_frontier.append(nxt)
+            frontier = next_frontier
+        return None
+
+    def expand_pushes(self, start_key, pushes):
+        """Turn a list of pushes back into the full list of directions,
+        starting from the real (non-normalized) player position."""
+        pb = self.player_bits
+        key = start_key
+        moves = []
+        for push in pushes:
+            box, d = divmod(push, 4)
+            moves.extend(self.walk(key, self.neighbours[box][d ^ 1]))
+            moves.append(d)
+            boxes = key >> pb
+            beyond = self.neighbours[box][d]
+            key = ((boxes ^ (1 << box) ^ (1 << beyond)) << pb) | box
+        return moves
+
+    # --- hashing ---------------------------------------------------------
+
+    def zobrist(self, key):
+        """Full Zobrist hash of a packed state."""
+        h = self.zobrist_player[key & self.player_mask]
+        for cell in self.box_cells(key):
+            h ^= self.zobrist_box[cell]
+        return h
+
+    def zobrist_move(self, h, key, next_key, pushed_to=-1):
+        """Incremental Zobrist update from key to a successor next_key.
+
+        Only the player cells and, for a push, the two box cells that
+        changed are folded in, so this works for step and push-level
+        successors alike.
+        """
+        mask = self.player_mask
+        h ^= self.zobrist_player[key & mask] ^ self.zobrist_player[next_key & mask]
+        if pushed_to >= 0:
+            pb = self.player_bits
+            left = ((key ^ next_key) >> pb) & (key >> pb)
+            h ^= self.zobrist_box[left.bit_length() - 1] ^ self.zobrist_box[pushed_to]
+        return h
+
+
+def as_level(level):
+    """PackedLevel for a level map; a PackedLevel is returned as it is,
+    so a caller solving one level several times builds it only once."""
+    return level if isinstance(level, PackedLevel) else PackedLevel(level)
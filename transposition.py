@@ -0,0 +1,92 @@
+"""Fixed-size transposition table for the depth-first solvers.
+
+Entries are (64-bit Zobrist hash, remaining depth) pairs in two flat
+arrays, so memory is fixed at construction time no matter how many states
+the search touches.  Each bucket has two slots:
+
+    slot 0  depth-preferred: only replaced by an entry searched at least
+            as deep (the old one is demoted to slot 1)
+    slot 1  always-replace: takes whatever did not make it into slot 0
+
+so deep, expensive results survive while recent shallow ones still get
+cached.  A lost entry only costs re-search, never correctness.
+"""
+from array import array
+
+DEFAULT_SIZE = 1 << 20
+
+
+class TranspositionTable:
+    """Maps state hash -> largest remaining depth it was searched with."""
+
+    def __init__(self, size=DEFAULT_SIZE):
+        buckets = 1
+        while buckets * 2 < size:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.hashes = array('Q', bytes(8 * 2 * buckets))
+        self.depths = array('h', bytes(2 * 2 * buckets))
+        self.used = 0
+        self.hits = 0
+        self.replaced = 0
+
+    def probe(self, h):
+        """Remaining depth stored for h, or -1 when unknown."""
+        h = h or 1
+        slot = (h & self.mask) * 2
+        hashes = self.hashes
+        if hashes[slot] == h:
+            self.hits += 1
+            return self.depths[slot]
+        if hashes[slot + 1] == h:
+            self.hits += 1
+            return self.depths[slot + 1]
+        return -1
+
+    def seen(self, h, depth):
+        """True when h was already searched with at least depth left;
+        otherwise record it with depth and return False."""
+        if self.probe(h) >= depth:
+            return True
+        self.store(h, depth)
+        return False
+
+    def store(self, h, depth):
+        h = h or 1
+        slot = (h & self.mask) * 2
+        hashes = self.hashes
+        depths = self.depths
+
+        if hashes[slot] == h:
+            if depth > depths[slot]:
+                depths[slot] = depth
+            return
+        if hashes[slot + 1] == h:
+            if depth > depths[slot + 1]:
+                depths[slot + 1] = depth
+            if depths[slot + 1] >= depths[slot]:
+                hashes[slot], hashes[slot + 1] = hashes[slot + 1], hashes[slot]
+                depths[slot], depths[slot + 1] = depths[slot + 1], depths[slot]
+            return
+
+        if hashes[slot + 1]:
+            self.replaced += 1
+        else:
+            self.used += 1
+        if not hashes[slot] or depth >= depths[slot]:
+            hashes[slot + 1] = hashes[slot]
+            depths[slot + 1] = depths[slot]
+            hashes[slot] = h
+            depths[slot] = depth
+        else:
+            hashes[slot + 1] = h
+            depths[slot + 1] = depth
+
+    def memory_bytes(self):
+        return (self.hashes.itemsize * len(self.hashes)
+                + self.depths.itemsize * len(self.depths))
+
+    def stats(self):
+        return (f"Transposition table: {self.used} entries "
+                f"({self.memory_bytes() // 1024} KB), {self.hits} hits, "
+                f"{self.replaced} replaced")
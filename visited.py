@@ -0,0 +1,239 @@
+"""Visited-state stores for the graph-search solvers.
+
+All stores hold packed int keys (see state_engine.py) and share one
+interface:
+
+    add(key) -> True if key was not in the store yet
+    key in store
+    len(store)
+    memory_bytes(), bytes_per_state(), false_positive_rate(), stats()
+
+SetVisited is a plain Python set: exact, but every entry costs a hash
+slot plus a whole int object.  HashVisited is an exact open-addressing
+table that keeps each key as fixed-width bytes inside one preallocated
+bytearray, so it costs a few bytes more than the key itself.
+BloomVisited is bitstate hashing: a fixed-size Bloom filter that never
+forgets a state but may claim an unseen one was visited, so a search
+using it can miss solutions with probability false_positive_rate().
+That is acceptable for DFS and IDS, which trade completeness for fixed
+memory anyway.
+
+Only the visited store shrinks: the solvers' search_core.NodeTable still
+keeps every generated key as an int in a list, for path reconstruction.
+BFS.py and DFS.py put bytes_per_state and false_positive_rate in stats.
+"""
+import math
+import sys
+
+# Expected number of states; HashVisited grows past it when needed.
+DEFAULT_CAPACITY = 1 << 12
+
+# Bloom filter size in bits (4 MB) and number of probes per key.
+DEFAULT_BLOOM_BITS = 1 << 25
+DEFAULT_BLOOM_HASHES = 4
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def _mix64(h):
+    """splitmix64 finalizer: spreads every input bit over all 64."""
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return h ^ (h >> 31)
+
+
+class SetVisited:
+    """Exact store backed by a Python set."""
+
+    def __init__(self):
+        self.keys = set()
+
+    def add(self, key):
+        keys = self.keys
+        if key in keys:
+            return False
+        keys.add(key)
+        return True
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def memory_bytes(self):
+        # The set's table plus every int object it references.
+        return sys.getsizeof(self.keys) + sum(sys.getsizeof(key) for key in self.keys)
+
+    def bytes_per_state(self):
+        return self.memory_bytes() / max(1, len(self))
+
+    def false_positive_rate(self):
+        return 0.0
+
+    def stats(self):
+        return (f"Visited (set): {len(self)} states, "
+                f"{self.bytes_per_state():.1f} bytes/state")
+
+
+class HashVisited:
+    """Exact open-addressing (linear probing) table over packed keys.
+
+    key_bits is the widest key the level can produce
+    (engine.size + engine.player_bits).  Slots store key + 1 as
+    big-endian bytes, so an all-zero slot means empty.  The table doubles
+    when it is 70% full.
+    """
+
+    def __init__(self, key_bits, capacity=DEFAULT_CAPACITY):
+        self.width = (key_bits + 8) // 8
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        bits = max(4, (capacity * 10 // 7).bit_length())
+        self.shift = 64 - bits
+        self.mask = (1 << bits) - 1
+        self.limit = (1 << bits) * 7 // 10
+        self.data = bytearray((1 << bits) * self.width)
+
+    def _slot(self, key, stored):
+        """(index, found) for the slot holding stored or the empty slot
+        where it belongs."""
+        width = self.width
+        data = self.data
+        mask = self.mask
+        empty = bytes(width)
+        index = ((hash(key) * _GOLDEN) & _MASK64) >> self.shift
+        while True:
+            start = index * width
+            slot = data[start:start + width]
+            if slot == stored:
+                return index, True
+            if slot == empty:
+                return index, False
+            index = (index + 1) & mask
+
+    def add(self, key):
+        stored = (key + 1).to_bytes(self.width, 'big')
+        index, found = self._slot(key, stored)
+        if found:
+            return False
+        start = index * self.width
+        self.data[start:start + self.width] = stored
+        self.count += 1
+        if self.count > self.limit:
+            self._grow()
+        return True
+
+    def __contains__(self, key):
+        return self._slot(key, (key + 1).to_bytes(self.width, 'big'))[1]
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        width = self.width
+        old = self.data
+        self._allocate(self.count * 2)
+        self.count = 0
+        for start in range(0, len(old), width):
+            stored = old[start:start + width]
+            if any(stored):
+                self.add(int.from_bytes(stored, 'big') - 1)
+
+    def memory_bytes(self):
+        return len(self.data)
+
+    def bytes_per_state(self):
+        return self.memory_bytes() / max(1, self.count)
+
+    def false_positive_rate(self):
+        return 0.0
+
+    def stats(self):
+        return (f"Visited (hash table): {self.count} states, "
+                f"{self.memory_bytes() // 1024} KB, {self.bytes_per_state():.1f} bytes/state")
+
+
+class BloomVisited:
+    """Approximate store: a Bloom filter of bits bits probed hashes times.
+
+    Besides the common interface it can stand in for the transposition
+    table of the depth-first solvers: seen(h, depth) records the pair
+    (state hash, remaining depth), so a state is only skipped when it was
+    already searched with exactly that much depth left.
+    """
+
+    def __init__(self, bits=DEFAULT_BLOOM_BITS, hashes=DEFAULT_BLOOM_HASHES):
+        size = 8
+        while size < bits:
+            size *= 2
+        self.bits = size
+        # Probes (double hashing) index with the top bits of 64-bit sums.
+        self.shift = 64 - (size.bit_length() - 1)
+        self.hashes = hashes
+        self.data = bytearray(size // 8)
+        self.count = 0
+
+    def _probes(self, key):
+        h = hash(key) & _MASK64
+        h1 = _mix64(h)
+        h2 = _mix64(h ^ _GOLDEN) | 1
+        shift = self.shift
+        return [((h1 + i * h2) & _MASK64) >> shift for i in range(self.hashes)]
+
+    def add(self, key):
+        data = self.data
+        new = False
+        for bit in self._probes(key):
+            byte = bit >> 3
+            flag = 1 << (bit & 7)
+            if not data[byte] & flag:
+                data[byte] |= flag
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, key):
+        data = self.data
+        return all(data[bit >> 3] & (1 << (bit & 7)) for bit in self._probes(key))
+
+    def __len__(self):
+        return self.count
+
+    def seen(self, h, depth):
+        """Transposition-table style check-and-record for (h, depth)."""
+        return not self.add(h ^ ((depth * _GOLDEN) & _MASK64))
+
+    def store(self, h, depth):
+        self.seen(h, depth)
+
+    def memory_bytes(self):
+        return len(self.data)
+
+    def bytes_per_state(self):
+        return self.memory_bytes() / max(1, self.count)
+
+    def false_positive_rate(self):
+        """Chance that the next unseen key is reported as visited:
+        (1 - e^(-k n / m))^k for n keys in m bits with k probes."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def stats(self):
+        return (f"Visited (Bloom filter): ~{self.count} states, "
+                f"{self.memory_bytes() // 1024} KB, {self.bytes_per_state():.1f} bytes/state, "
+                f"false-positive rate ~{self.false_positive_rate():.2e}")
+
+
+def make_visited(kind, engine):
+    """'set', 'table' (HashVisited) or 'bloom' (BloomVisited)."""
+    if kind == 'set':
+        return SetVisited()
+    if kind == 'table':
+        return HashVisited(engine.size + engine.player_bits)
+    if kind == 'bloom':
+        return BloomVisited()
+    raise ValueError(f"unknown visited store: {kind!r}")